@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Import-time benchmark for the civil package.
+
+Each case runs in a fresh Python process (a cold start), calls one scalar
+function and exits, like a short-lived worker. "eager" imports NumPy first,
+which is what every civil module used to do; "lazy" relies on the package's
+lazy imports and pure-math scalar path.
+
+Run from the docs/source folder:  python benchmarks/import_time.py
+
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+source_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+runs = 20
+
+cases = {
+    "eager": "import numpy\n"
+             "from civil import water\n"
+             "water.velocity_and_flow(*water.pipe(36, 8), 0.005, 0.025)\n",
+    "lazy": "from civil import water\n"
+            "water.velocity_and_flow(*water.pipe(36, 8), 0.005, 0.025)\n"
+            "import sys\n"
+            "assert 'numpy' not in sys.modules\n",
+}
+
+
+# =============================================================================
+# Time each case in fresh processes.
+# =============================================================================
+
+results = {}
+for name, code in cases.items():
+    times = []
+    for run in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=source_folder, check=True)
+        times.append(time.perf_counter() - start)
+    results[name] = statistics.median(times)
+    print(name, "median", round(results[name] * 1000, 1), "ms over", runs, "runs")
+
+print(" ")
+print("Cold start is", round(results["eager"]/results["lazy"], 1), "times faster without NumPy")
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput benchmark for the linear_systems module.
+
+Solves N small stiffness-like systems (symmetric positive definite, n x n)
+the way matrix_analysis.rst does, one at a time in a loop, and with the
+batched functions:
+
+- "loop inv": np.dot(np.linalg.inv(A), b) for each system;
+- "loop solve": np.linalg.solve(A, b) for each system;
+- "batched solve": one linear_systems.solve call on the (N, n, n) stack.
+
+Then each stack is solved for several load cases that arrive one after
+another, factoring every time versus reusing LU factors:
+
+- "loop scipy LU": scipy.linalg.lu_factor and lu_solve for each system;
+- "batched solve": linear_systems.solve for each load case;
+- "cached LU": LUCache.solve for each load case (factors once).
+
+Run from the docs/source folder:  python benchmarks/linear_systems_throughput.py
+
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import linalg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import linear_systems  # noqa: E402
+
+systems = 10000
+sizes = [3, 6, 12]
+load_cases = 20
+
+
+def best_time(function, repeats=3):
+    """Returns the shortest of a few runs, in seconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def report(label, seconds, count):
+    print("  {:<16}{:>10.4f} s {:>14,.0f} systems/s".format(label, seconds, count/seconds))
+
+
+rng = np.random.default_rng(0)
+for n in sizes:
+    # Stiffness-like matrices: symmetric and positive definite.
+    G = rng.normal(size=(systems, n, n))
+    A = G @ np.swapaxes(G, -1, -2) + n * np.eye(n)
+    b = rng.normal(size=(systems, n))
+    loads = rng.normal(size=(load_cases, systems, n))
+
+    # =========================================================================
+    # One load case.
+    # =========================================================================
+
+    print("N =", systems, "systems of size", n)
+    expected = np.array([np.linalg.solve(a, v) for a, v in zip(A, b)])
+    assert np.allclose(linear_systems.solve(A, b), expected)
+    report("loop inv", best_time(lambda: [np.dot(np.linalg.inv(a), v) for a, v in zip(A, b)]),
+           systems)
+    report("loop solve", best_time(lambda: [np.linalg.solve(a, v) for a, v in zip(A, b)]),
+           systems)
+    report("batched solve", best_time(lambda: linear_systems.solve(A, b)), systems)
+
+    # =========================================================================
+    # Many load cases on the same matrices.
+    # =========================================================================
+
+    def loop_lu():
+        return [[linalg.lu_solve(linalg.lu_factor(a), v) for a, v in zip(A, load)]
+                for load in loads]
+
+    def batched():
+        return [linear_systems.solve(A, load) for load in loads]
+
+    def cached():
+        cache = linear_systems.LUCache()
+        return [cache.solve(A, load) for load in loads]
+
+    assert np.allclose(cached(), batched())
+    print(" ", load_cases, "load cases")
+    report("loop scipy LU", best_time(loop_lu, repeats=1), systems * load_cases)
+    report("batched solve", best_time(batched), systems * load_cases)
+    report("cached LU", best_time(cached), systems * load_cases)
+    print(" ")
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the transforms module against the row-wise apply examples.
+
+Builds a synthetic gas temperature log like Temperature_Data.xlsx and times
+the data_analysis.py / df_time_data.py versions (df.apply with axis=1)
+against the vectorized helpers, checking that both give the same columns.
+
+Run from the docs/source folder:  python benchmarks/transforms_vs_apply.py
+
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import transforms  # noqa: E402
+
+
+rows = 200000
+rng = np.random.default_rng(0)
+df = pd.DataFrame({
+    "Time": pd.date_range("2019-01-18 17:00", periods=rows, freq="2min"),
+    "Gas1": rng.uniform(90, 120, rows),
+    "Gas2": rng.uniform(40, 60, rows),
+    "Gas3": rng.uniform(55, 75, rows),
+})
+
+
+# =============================================================================
+# Course versions: one Python function call per row.
+# =============================================================================
+
+def f(row):
+    temp_f = row['Gas1']
+    temp_c = (temp_f - 32)*5/9
+    return temp_c
+
+
+def year(row):
+    return row['Time'].year
+
+
+def minute(row):
+    return row['Time'].minute
+
+
+slow = df.copy()
+start = time.perf_counter()
+slow['Gas1_C'] = slow.apply(f, axis='columns')
+slow['Year'] = slow.apply(year, axis=1)
+slow['Minute'] = slow.apply(minute, axis=1)
+slow["Combined"] = slow['Gas1'] + slow['Gas2']
+apply_time = time.perf_counter() - start
+
+
+# =============================================================================
+# Vectorized helpers.
+# =============================================================================
+
+fast = df.copy()
+start = time.perf_counter()
+transforms.fahrenheit_to_celsius(fast, "Gas1")
+transforms.datetime_fields(fast, "Time", ("year", "minute"))
+transforms.combine_columns(fast, ["Gas1", "Gas2"])
+vector_time = time.perf_counter() - start
+
+for column in ["Gas1_C", "Year", "Minute", "Combined"]:
+    assert np.allclose(slow[column], fast[column]), column
+
+print(rows, "rows")
+print("apply     ", round(apply_time, 3), "s")
+print("vectorized", round(vector_time, 4), "s")
+print("Speed up  ", round(apply_time/vector_time), "times")
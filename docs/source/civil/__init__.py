@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""Civil engineering package.
+
+Provides modules for environmental, geotechnical, structural and water
+engineering analysis and design. Each module is imported the first time it
+is used (e.g. ``civil.water.pipe(36, 8)``), so ``import civil`` is quick.
+
+"""
+import importlib
+
+__all__ = ["environmental", "geotech", "materials", "network", "routing", "structures",
+           "sweep", "water"]
+
+
+def __getattr__(name):
+    """Imports a submodule on first access (PEP 562)."""
+    if name in __all__:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
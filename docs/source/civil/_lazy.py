@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""Lazy imports for the civil package.
+
+NumPy takes far longer to import than any calculation in this package, so
+modules use the ``numpy`` proxy below and plain ``math`` for scalar inputs.
+NumPy is only imported the first time an array function is needed.
+
+"""
+import importlib
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+    def __repr__(self):
+        return "<lazy module {!r}>".format(self._name)
+
+
+numpy = LazyModule("numpy")
+
+
+def is_scalar(*values):
+    """Returns True if every value is a plain int or float (no NumPy needed)."""
+    return all(isinstance(value, (int, float)) for value in values)
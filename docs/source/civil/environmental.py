@@ -8,7 +8,9 @@ Provides functions for environmental engineering analysis and design.
 __author__ = 'Mike Lowry'
 __version__ = 1.0
 
-import numpy as np
+import math
+
+from ._lazy import numpy as np
 
 def detention_time(influent, height, diameter):
     """Calculates the detention time in a primary clarifier.
@@ -26,7 +28,151 @@ def detention_time(influent, height, diameter):
     Z = height
     D = diameter
     
-    A = (np.pi * D**2)/4
+    A = (math.pi * D**2)/4
     V = A * Z
     detention_time = V/Q
-    return detention_time
\ No newline at end of file
+    return detention_time
+
+# =============================================================================
+# Streaming detention time statistics for influent time series.
+# =============================================================================
+
+def read_influent(path, column, chunksize=1000000):
+    """Yields influent values from a CSV or Parquet file one chunk at a time.
+
+    Args:
+        path: CSV file, or Parquet file (needs pyarrow) ending in .parquet.
+        column: Name of the influent column (ft^3/hr).
+        chunksize: Rows per chunk.
+
+    Yields:
+        influent: NumPy array of one chunk of influent values.
+
+    """
+    if str(path).lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=[column]):
+            yield batch.column(0).to_numpy(zero_copy_only=False).astype(float)
+    else:
+        import pandas as pd
+
+        reader = pd.read_csv(path, usecols=[column], dtype={column: "float64"},
+                             chunksize=chunksize)
+        for chunk in reader:
+            yield chunk[column].to_numpy()
+
+
+class DetentionMonitor:
+    """Running detention time statistics for one or more clarifiers.
+
+    Memory does not grow with the length of the record: each tank keeps a
+    count, sum, minimum, maximum, violation count and a histogram with
+    log-spaced bins for percentiles. Percentiles are accurate to the bin
+    width, about 0.5% with the defaults.
+
+    Args:
+        height: Tank heights in ft (one per tank).
+        diameter: Tank diameters in ft (one per tank).
+        minimum_time: Detention times below this (hours) count as violations.
+        bins: Number of histogram bins.
+        time_range: (smallest, largest) detention time in hours covered by
+            the histogram; values outside go in the end bins.
+
+    """
+
+    def __init__(self, height, diameter, minimum_time=2.0, bins=4000,
+                 time_range=(1e-3, 1e5)):
+        height, diameter = np.broadcast_arrays(np.atleast_1d(height),
+                                               np.atleast_1d(diameter))
+        self.volume = (math.pi * diameter**2)/4 * height  # Same as detention_time().
+        self.minimum_time = minimum_time
+        self.bins = bins
+        self.log_range = np.log10(time_range)
+        tanks = len(self.volume)
+
+        self.count = np.zeros(tanks, dtype=np.int64)
+        self.no_flow = 0
+        self.total = np.zeros(tanks)
+        self.minimum = np.full(tanks, np.inf)
+        self.maximum = np.full(tanks, -np.inf)
+        self.violations = np.zeros(tanks, dtype=np.int64)
+        self.histogram = np.zeros((tanks, bins), dtype=np.int64)
+
+    def update(self, influent):
+        """Adds a chunk of influent values (ft^3/hr) to the statistics."""
+        Q = np.asarray(influent, dtype=float).ravel()
+        flowing = Q > 0
+        self.no_flow += int(Q.size - np.count_nonzero(flowing))
+        Q = Q[flowing]
+        if Q.size == 0:
+            return
+
+        times = self.volume[:, None] / Q[None, :]  # Tanks x samples.
+        self.count += Q.size
+        self.total += times.sum(axis=1)
+        np.minimum(self.minimum, times.min(axis=1), out=self.minimum)
+        np.maximum(self.maximum, times.max(axis=1), out=self.maximum)
+        self.violations += np.count_nonzero(times < self.minimum_time, axis=1)
+
+        low, high = self.log_range
+        position = (np.log10(times) - low) * (self.bins/(high - low))
+        index = np.clip(position.astype(np.intp), 0, self.bins - 1)
+        index += np.arange(len(self.volume))[:, None] * self.bins
+        self.histogram += np.bincount(index.ravel(), minlength=self.histogram.size
+                                      ).reshape(self.histogram.shape)
+
+    def percentile(self, q):
+        """Returns detention time percentiles (0-100) for each tank."""
+        q = np.atleast_1d(q)
+        low, high = self.log_range
+        edges = np.linspace(low, high, self.bins + 1)
+        cumulative = np.cumsum(self.histogram, axis=1)
+        result = np.full((len(self.volume), len(q)), np.nan)
+        for tank in range(len(self.volume)):
+            if self.count[tank] == 0:
+                continue
+            # Interpolate inside the bin on the log scale.
+            rank = q/100 * self.count[tank]
+            k = np.minimum(np.searchsorted(cumulative[tank], rank), self.bins - 1)
+            before = np.where(k > 0, cumulative[tank][k - 1], 0)
+            inside = np.maximum(self.histogram[tank][k], 1)
+            fraction = np.clip((rank - before)/inside, 0, 1)
+            value = 10**(edges[k] + fraction * (edges[k + 1] - edges[k]))
+            result[tank] = np.clip(value, self.minimum[tank], self.maximum[tank])
+        return result
+
+    def summary(self, percentiles=(5, 50, 95)):
+        """Returns a dictionary of statistics, one value per tank."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.total/self.count
+        result = {"count": self.count.copy(), "no_flow": self.no_flow,
+                  "min": self.minimum.copy(), "max": self.maximum.copy(),
+                  "mean": mean, "violations": self.violations.copy()}
+        values = self.percentile(percentiles)
+        for i, q in enumerate(percentiles):
+            result["p{:g}".format(q)] = values[:, i]
+        return result
+
+
+def detention_time_stream(chunks, height, diameter, minimum_time=2.0,
+                          percentiles=(5, 50, 95)):
+    """Screens a stream of influent chunks against one or more clarifiers.
+
+    Args:
+        chunks: Iterable of influent arrays or Series in ft^3/hr, e.g.
+            read_influent() or a generator.
+        height: Tank heights in ft.
+        diameter: Tank diameters in ft.
+        minimum_time: Detention times below this (hours) count as violations.
+        percentiles: Percentiles of detention time to report.
+
+    Returns:
+        summary: Dictionary of statistics from DetentionMonitor.summary().
+
+    """
+    monitor = DetentionMonitor(height, diameter, minimum_time)
+    for chunk in chunks:
+        monitor.update(chunk)
+    return monitor.summary(percentiles)
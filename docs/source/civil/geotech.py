@@ -7,7 +7,14 @@ By Mike Lowry.
 3/25/2019
 
 """
-import numpy as np
+import math
+
+from . import materials
+from ._lazy import LazyModule
+from ._lazy import is_scalar
+from ._lazy import numpy as np
+
+optimize = LazyModule("scipy.optimize")
 
 
 def gravity_retaining_wall(base, height, gamma_soil, gamma_wall, phi, mu, load):
@@ -18,7 +25,8 @@ def gravity_retaining_wall(base, height, gamma_soil, gamma_wall, phi, mu, load):
     H = height
     q = load
     W = B * H * gamma_wall
-    Ka = (1 - np.sin(phi))/(1 + np.sin(phi))
+    sin_phi = math.sin(phi) if is_scalar(phi) else np.sin(phi)
+    Ka = (1 - sin_phi)/(1 + sin_phi)
     Pa = 1/2 * Ka * gamma_soil * H**2 + q * H
     FR = W * mu
     M_OT = Pa * H/3
@@ -31,4 +39,172 @@ def gravity_retaining_wall(base, height, gamma_soil, gamma_wall, phi, mu, load):
     return SFOS, OFOS
 
 
+def gravity_retaining_wall_design(base, height, material, gamma_soil, phi, mu,
+                                  load, length, catalogue=None):
+    """Calculates SFOS, OFOS and cost of walls built from catalogue materials.
+
+    Args:
+        base: Wall base in feet.
+        height: Wall height in feet.
+        material: Material IDs or catalogue indexes (arrays broadcast).
+        gamma_soil: Specific weight of soil.
+        phi: Soil friction angle in radians.
+        mu: Soil friction.
+        load: Additional load on soil behind the wall.
+        length: Wall length in feet.
+        catalogue: materials.Catalogue. Default is materials.csv.
+
+    Returns:
+        SFOS: Sliding factor of safety.
+        OFOS: Overturning factor of safety.
+        cost: Wall cost.
+
+    """
+    if catalogue is None:
+        catalogue = materials.catalogue()
+    material = catalogue.index(material)
+    gamma_wall = catalogue["unit_weight"][material]
+    SFOS, OFOS = gravity_retaining_wall(base, height, gamma_soil, gamma_wall, phi, mu, load)
+    cost = (base * height * length) * catalogue["cost_rate"][material]
+    return SFOS, OFOS, cost
+
+
+def gravity_retaining_wall_gradient(base, height, gamma_soil, gamma_wall, phi, mu, load):
+    """Calculates the derivatives of SFOS and OFOS with respect to B and H.
+
+    From SFOS = mu*B*H*gamma_wall/Pa and OFOS = 1.5*gamma_wall*B^2/Pa with
+    Pa = Ka*gamma_soil*H^2/2 + q*H.
+
+    Returns:
+        dSFOS_dB, dSFOS_dH, dOFOS_dB, dOFOS_dH
+
+    """
+    B = base
+    H = height
+    q = load
+    sin_phi = math.sin(phi) if is_scalar(phi) else np.sin(phi)
+    Ka = (1 - sin_phi)/(1 + sin_phi)
+    Pa = 1/2 * Ka * gamma_soil * H**2 + q * H
+    dPa_dH = Ka * gamma_soil * H + q
+
+    dSFOS_dB = mu * H * gamma_wall / Pa
+    dSFOS_dH = mu * B * gamma_wall * (Pa - H * dPa_dH) / Pa**2
+    dOFOS_dB = 3 * gamma_wall * B / Pa
+    dOFOS_dH = -1.5 * gamma_wall * B**2 * dPa_dH / Pa**2
+    return dSFOS_dB, dSFOS_dH, dOFOS_dB, dOFOS_dH
+
+
+def retaining_wall_cost(base, height, length, cost_rate):
+    """Calculates wall cost and its derivatives with respect to B and H.
+
+    Returns:
+        cost, dcost_dB, dcost_dH
+
+    """
+    return (base * height * length * cost_rate, height * length * cost_rate,
+            base * length * cost_rate)
+
+
+def optimize_retaining_wall(gamma_soil, phi, mu, load, length, material=None,
+                            catalogue=None, min_SFOS=1.5, min_OFOS=1.5,
+                            base_bounds=(1, 4), height_bounds=(6, 12), increment=None):
+    """Finds the minimum-cost wall base and height for each material.
+
+    Solves the continuous problem with SLSQP using the closed-form
+    derivatives above, so each material takes a handful of evaluations
+    instead of a grid search. With an increment (e.g. 0.5 ft) the optimum is
+    then snapped to the cheapest feasible grid point around it.
+
+    Args:
+        gamma_soil: Specific weight of soil.
+        phi: Soil friction angle in radians.
+        mu: Soil friction.
+        load: Additional load on soil behind the wall.
+        length: Wall length in feet.
+        material: Material IDs or indexes. Default is every wall material
+            in the catalogue (a unit weight and no allowable stress).
+        catalogue: materials.Catalogue. Default is materials.csv.
+        min_SFOS: Minimum sliding factor of safety.
+        min_OFOS: Minimum overturning factor of safety.
+        base_bounds: (min, max) base in feet; also the grid origin.
+        height_bounds: (min, max) height in feet; also the grid origin.
+        increment: Grid step in feet for discrete designs. Default is None.
+
+    Returns:
+        designs: Record array with material, B, H, cost, SFOS, OFOS and
+            evaluations, sorted by cost. B and H are NaN if no design works.
+
+    """
+    if catalogue is None:
+        catalogue = materials.catalogue()
+    if material is None:
+        # Wall materials: a unit weight but no allowable stress (not steel).
+        material = np.flatnonzero(~np.isnan(catalogue["unit_weight"])
+                                  & np.isnan(catalogue["allowable_stress"]))
+    material = np.atleast_1d(catalogue.index(material))
+    bounds = [base_bounds, height_bounds]
+    columns = {name: [] for name in ("material", "B", "H", "cost", "SFOS", "OFOS", "evaluations")}
+
+    for m in material:
+        gamma_wall = catalogue["unit_weight"][m]
+        rate = catalogue["cost_rate"][m]
+        args = (gamma_soil, gamma_wall, phi, mu, load)
+        scale = retaining_wall_cost(base_bounds[1], height_bounds[1], length, rate)[0]
+
+        def cost(x):
+            return retaining_wall_cost(x[0], x[1], length, rate)[0]/scale
+
+        def cost_gradient(x):
+            return np.array(retaining_wall_cost(x[0], x[1], length, rate)[1:])/scale
+
+        def safety(x):
+            SFOS, OFOS = gravity_retaining_wall(x[0], x[1], *args)
+            return np.array([SFOS - min_SFOS, OFOS - min_OFOS])
+
+        def safety_gradient(x):
+            dS_dB, dS_dH, dO_dB, dO_dH = gravity_retaining_wall_gradient(x[0], x[1], *args)
+            return np.array([[dS_dB, dS_dH], [dO_dB, dO_dH]])
+
+        # Start from the strongest wall (largest base, smallest height).
+        result = optimize.minimize(
+            cost, [base_bounds[1], height_bounds[0]], jac=cost_gradient,
+            bounds=bounds, method="SLSQP",
+            constraints=[{"type": "ineq", "fun": safety, "jac": safety_gradient}])
+        B, H = result.x
+        if not result.success or safety(result.x).min() < -1e-6:
+            B, H = np.nan, np.nan
+        elif increment:
+            B, H = _snap_to_grid(B, H, increment, bounds, args, length, rate,
+                                 min_SFOS, min_OFOS)
+
+        SFOS, OFOS = gravity_retaining_wall(B, H, *args)
+        for name, value in zip(columns, (m, B, H, retaining_wall_cost(B, H, length, rate)[0],
+                                         SFOS, OFOS, result.nfev)):
+            columns[name].append(value)
+
+    designs = np.rec.fromarrays([np.array(values) for values in columns.values()],
+                                names=list(columns))
+    return designs[np.argsort(designs["cost"], kind="stable")]
+
+
+def _snap_to_grid(B, H, increment, bounds, args, length, cost_rate, min_SFOS, min_OFOS):
+    """Returns the cheapest feasible grid design next to a continuous optimum.
+
+    SFOS and OFOS rise with B and fall with H, so the candidates are a few
+    grid steps above the optimum base and below the optimum height.
+    """
+    steps = np.arange(-1, 4)
+    (B_min, B_max), (H_min, H_max) = bounds
+    B_grid = B_min + increment * (np.floor((B - B_min)/increment) + steps)
+    H_grid = H_min + increment * (np.ceil((H - H_min)/increment) - steps)
+    B_grid = B_grid[(B_grid >= B_min) & (B_grid <= B_max + 1e-9)]
+    H_grid = H_grid[(H_grid >= H_min - 1e-9) & (H_grid <= H_max)]
+    B_grid, H_grid = np.meshgrid(B_grid, H_grid)
 
+    SFOS, OFOS = gravity_retaining_wall(B_grid, H_grid, *args)
+    cost = retaining_wall_cost(B_grid, H_grid, length, cost_rate)[0]
+    cost = np.where((SFOS >= min_SFOS) & (OFOS >= min_OFOS), cost, np.inf)
+    if cost.size == 0 or np.isinf(cost.min()):
+        return np.nan, np.nan
+    best = np.argmin(cost)
+    return B_grid.flat[best], H_grid.flat[best]
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Material catalogue module.
+
+Provides a column-oriented table of material properties for design
+searches. Each property is one NumPy array and materials are looked up by
+integer index, so a whole grid of designs can take its properties with one
+array index instead of an if/elif chain on material names.
+
+The default catalogue is ``materials.csv`` next to this module. Columns:
+id, name, unit_weight (lb/ft^3), cost_rate ($/ft^3), modulus_E (psi) and
+allowable_stress (psi). Blank cells are read as NaN.
+
+"""
+
+import csv
+import os
+
+from ._lazy import numpy as np
+
+default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "materials.csv")
+text_columns = ("id", "name")
+_catalogues = {}
+
+
+class Catalogue:
+    """Material properties stored as one array per column.
+
+    Args:
+        columns: Dictionary of column name to sequence of values. Must
+            include "id".
+
+    """
+
+    def __init__(self, columns):
+        self.columns = {}
+        for name, values in columns.items():
+            dtype = str if name in text_columns else float
+            self.columns[name] = np.asarray(values, dtype=dtype)
+        self.ids = self.columns["id"]
+        self._positions = {material_id: i for i, material_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def __repr__(self):
+        return "Catalogue({} materials: {})".format(len(self), ", ".join(self.ids))
+
+    @classmethod
+    def from_csv(cls, path):
+        """Reads a catalogue from a CSV file with a header row."""
+        with open(path, newline="") as file:
+            rows = list(csv.DictReader(file))
+        columns = {}
+        for name in rows[0] if rows else ("id",):
+            values = [row[name].strip() for row in rows]
+            if name not in text_columns:
+                values = [value if value else "nan" for value in values]
+            columns[name] = values
+        return cls(columns)
+
+    def index(self, material):
+        """Returns integer indexes for material IDs (indexes pass through)."""
+        material = np.asarray(material)
+        if material.dtype.kind not in "US":
+            return material.astype(np.intp)
+
+        # Look up each distinct ID once, then spread the results.
+        ids, inverse = np.unique(material, return_inverse=True)
+        try:
+            positions = np.array([self._positions[material_id] for material_id in ids])
+        except KeyError as error:
+            raise ValueError("Unknown material: {}".format(error.args[0]))
+        return positions[inverse].reshape(material.shape)
+
+    def take(self, column, material):
+        """Returns a column's values for material IDs or indexes."""
+        return self.columns[column][self.index(material)]
+
+
+def catalogue(path=default_path):
+    """Returns the catalogue in a CSV file, reading each file only once."""
+    path = os.path.abspath(path)
+    if path not in _catalogues:
+        _catalogues[path] = Catalogue.from_csv(path)
+    return _catalogues[path]
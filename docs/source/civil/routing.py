@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""Hydrograph routing module.
+
+Routes inflow hydrographs through systems of reaches (pipes and channels)
+and basins, one time step after another, using the section geometry of
+civil.water and the tank geometry of civil.environmental.
+
+Hydraulics are computed once, not at every step: each reach gets a
+stage-storage-discharge table from water.batch_flow (Manning flow at a
+range of depths, storage = flow area * length), and each basin a table
+from its tank volume and outlet pipe. Routing then only interpolates the
+tables.
+
+- Muskingum reaches: K is the travel time dS/dQ read from the table at a
+  reference flow (L/celerity), so it follows the section, slope and
+  roughness. Each reach is a linear filter of its inflow, run over the
+  whole chunk of time steps in compiled code (scipy.signal.lfilter).
+- Level-pool reaches and basins (storage indication method): every time
+  step interpolates the 2S/dt + O table of all reaches of a level at
+  once.
+
+Reaches are routed in levels: headwater reaches first, then every reach
+whose upstream reaches are all done. Inflow is given in chunks (e.g. a day
+of 1-minute steps), and the state is kept between chunks, so a year of
+data never has to be in memory at once.
+
+Example:
+
+    >>> from civil import routing, water
+    >>> pipes = water.sections("pipe", [24, 24, 36])
+    >>> storage, discharge = routing.rating_tables(pipes, 500, 0.005, 0.013)[1:]
+    >>> router = routing.Router([2, 2, -1], storage, discharge, dt=60)
+    >>> outflow = router.route(lateral)  # lateral: (time steps, 3) in cfs.
+
+"""
+
+from . import environmental
+from . import water
+from ._lazy import LazyModule
+from ._lazy import numpy as np
+
+signal = LazyModule("scipy.signal")
+
+_area_factor = {"US": 144.0, "SI": 10000.0}  # in^2 per ft^2, cm^2 per m^2.
+_depth_factor = {"US": 12.0, "SI": 100.0}  # in per ft, cm per m.
+
+
+def rating_tables(sections, length, slope, roughness_n, max_depth=None, points=65,
+                  units="US", fast=False):
+    """Calculates stage-storage-discharge tables for prismatic reaches.
+
+    Args:
+        sections: Structured array from water.sections(), one per reach.
+        length: Reach length in ft or m.
+        slope: Slope in ft/ft or m/m.
+        roughness_n: Manning's roughness coefficient.
+        max_depth: Deepest table depth in inches or cm. Default for pipes
+            is the depth of largest flow (water.pipe_max_flow_ratio); open
+            channels need it.
+        points: Depths per table.
+        units: US or SI. Default is US.
+        fast: Interpolate pipes from water.pipe_table().
+
+    Returns:
+        depth: Depths in inches or cm, shape (reaches, points).
+        storage: Stored volume in ft^3 or m^3.
+        discharge: Flow in cfs or m^3/sec.
+
+    """
+    sections = np.atleast_1d(sections)
+    pipe = sections["kind"] == water.section_kinds["pipe"]
+    if max_depth is None:
+        if not pipe.all():
+            raise ValueError("max_depth is needed for open channel reaches")
+        max_depth = water.pipe_max_flow_ratio * sections["size"]
+    shape = sections.shape + (1,)
+    depth = (np.broadcast_to(max_depth, sections.shape).reshape(shape)
+             * np.linspace(0, 1, points))
+    P, Rh, A, v, Q = water.batch_flow(
+        sections.reshape(shape), depth, np.reshape(np.broadcast_to(slope, sections.shape), shape),
+        np.reshape(np.broadcast_to(roughness_n, sections.shape), shape), units, fast)
+    storage = A/_area_factor[units] * np.reshape(np.broadcast_to(length, sections.shape), shape)
+    return depth, np.nan_to_num(storage), np.nan_to_num(Q)  # Dry: 0/0 is 0.
+
+
+def basin_tables(diameter, height, outlet, outlet_slope, outlet_n, points=65, units="US"):
+    """Calculates stage-storage-discharge tables for cylindrical basins.
+
+    Each basin drains through an outlet pipe or channel assumed to flow at
+    normal depth equal to the basin stage (pipes at most at the depth of
+    largest flow).
+
+    Args:
+        diameter: Basin diameter in ft or m.
+        height: Basin depth in ft or m.
+        outlet: Structured array from water.sections(), one per basin.
+        outlet_slope: Outlet slope in ft/ft or m/m.
+        outlet_n: Manning's roughness coefficient of the outlet.
+        points: Stages per table.
+        units: US or SI. Default is US.
+
+    Returns:
+        stage: Water levels in ft or m, shape (basins, points).
+        storage: Stored volume in ft^3 or m^3.
+        discharge: Outflow in cfs or m^3/sec.
+        detention: Detention time in hours at steady flow through each
+            stage (environmental.detention_time), inf when dry.
+
+    """
+    outlet = np.atleast_1d(outlet)
+    shape = outlet.shape + (1,)
+    diameter = np.reshape(np.broadcast_to(diameter, outlet.shape), shape)
+    stage = np.reshape(np.broadcast_to(height, outlet.shape), shape) * np.linspace(0, 1, points)
+    storage = (np.pi * diameter**2)/4 * stage  # Same volume as detention_time().
+
+    depth = stage * _depth_factor[units]
+    pipe = (outlet["kind"] == water.section_kinds["pipe"]).reshape(shape)
+    depth = np.where(pipe, np.minimum(depth, water.pipe_max_flow_ratio
+                                      * outlet["size"].reshape(shape)), depth)
+    Q = np.nan_to_num(water.batch_flow(
+        outlet.reshape(shape), depth, np.reshape(np.broadcast_to(outlet_slope, outlet.shape), shape),
+        np.reshape(np.broadcast_to(outlet_n, outlet.shape), shape), units)[4])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        detention = environmental.detention_time(Q * 3600, stage, diameter)
+    return stage, storage, Q, np.where(Q > 0, detention, np.inf)
+
+
+def levels(downstream):
+    """Groups reaches into routing levels.
+
+    Args:
+        downstream: Index of the reach each reach drains into, -1 at outlets.
+
+    Returns:
+        level: Level of each reach; 0 for headwaters, otherwise one more
+            than its highest upstream reach.
+
+    """
+    downstream = np.asarray(downstream, dtype=np.intp)
+    draining = np.flatnonzero(downstream >= 0)
+    level = np.zeros(len(downstream), dtype=np.intp)
+    for _ in range(len(downstream) + 1):
+        new = level.copy()
+        np.maximum.at(new, downstream[draining], level[draining] + 1)
+        if np.array_equal(new, level):
+            return level
+        level = new
+    raise ValueError("The reaches drain in a loop")
+
+
+def muskingum_coefficients(K, x, dt):
+    """Calculates Muskingum routing coefficients.
+
+    K is raised to at least dt/2 and x lowered where needed so no
+    coefficient is negative (short reaches just average two steps).
+
+    Args:
+        K: Travel time in seconds.
+        x: Weighting factor, 0 (reservoir) to 0.5 (pure translation).
+        dt: Time step in seconds.
+
+    Returns:
+        C0, C1, C2: Outflow is C0*I[t] + C1*I[t-1] + C2*O[t-1].
+        K, x: The values used.
+
+    """
+    K = np.maximum(np.asarray(K, dtype=float), dt/2)
+    x = np.clip(x, 0, np.minimum(dt/(2*K), 1 - dt/(2*K)))
+    denominator = 2*K*(1 - x) + dt
+    C0 = (dt - 2*K*x)/denominator
+    C1 = (dt + 2*K*x)/denominator
+    C2 = (2*K*(1 - x) - dt)/denominator
+    return C0, C1, C2, K, x
+
+
+class Router:
+    """Routes chunks of inflow through a system of reaches, keeping its state.
+
+    Args:
+        downstream: Index of the reach each reach drains into, -1 at outlets.
+        storage: Storage tables, shape (reaches, points), ft^3 or m^3,
+            increasing (from rating_tables or basin_tables).
+        discharge: Discharge tables of the same shape, cfs or m^3/sec,
+            increasing.
+        dt: Time step in seconds.
+        level_pool: True (or a boolean per reach) to route with the storage
+            indication method instead of Muskingum; use it for basins.
+        x: Muskingum weighting factor.
+        reference_flow: Flow where K = dS/dQ is read from the tables.
+            Default is half the largest table flow of each reach.
+        initial_flow: Steady flow in each reach at the start.
+        table_points: Points of the uniform 2S/dt + O tables of level-pool
+            reaches.
+
+    """
+
+    def __init__(self, downstream, storage, discharge, dt, level_pool=False, x=0.2,
+                 reference_flow=None, initial_flow=0.0, table_points=257):
+        self.downstream = np.asarray(downstream, dtype=np.intp)
+        storage = np.asarray(storage, dtype=float)
+        discharge = np.asarray(discharge, dtype=float)
+        reaches = len(self.downstream)
+        self.dt = dt
+        self.level_pool = np.broadcast_to(level_pool, reaches).astype(bool)
+        self.level = levels(self.downstream)
+
+        # Muskingum reaches: K = dS/dQ at the reference flow.
+        if reference_flow is None:
+            reference_flow = discharge[:, -1]/2
+        reference_flow = np.broadcast_to(reference_flow, reaches)
+        K = np.empty(reaches)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for i in range(reaches):
+                slope = np.gradient(storage[i], discharge[i])
+                K[i] = np.interp(reference_flow[i], discharge[i], slope)
+        self.C0, self.C1, self.C2, self.K, self.x = muskingum_coefficients(K, x, dt)
+
+        # Level-pool reaches: outflow on a uniform grid of 2S/dt + O, so a
+        # step looks up every reach with the same arithmetic.
+        indication = 2 * storage/dt + discharge
+        self._step = indication[:, -1]/(table_points - 1)
+        grid = np.linspace(0, 1, table_points)
+        self._outflow_table = np.array([np.interp(grid * indication[i, -1], indication[i],
+                                                  discharge[i]) for i in range(reaches)])
+        self._storage_table = storage
+        self._discharge_table = discharge
+
+        # Per level: Muskingum reaches, level-pool reaches, and where they drain.
+        self._levels = []
+        for value in range(self.level.max() + 1 if reaches else 0):
+            reaches_in = np.flatnonzero(self.level == value)
+            drains = [(j, self.downstream[j]) for j in reaches_in if self.downstream[j] >= 0]
+            self._levels.append((reaches_in[~self.level_pool[reaches_in]],
+                                 reaches_in[self.level_pool[reaches_in]], drains))
+        self.reset(initial_flow)
+
+    def reset(self, initial_flow=0.0):
+        """Sets every reach to a steady flow."""
+        flow = np.broadcast_to(np.asarray(initial_flow, dtype=float),
+                               self.downstream.shape).copy()
+        self.inflow = flow.copy()
+        self.outflow = flow
+        self._pool_storage = np.array([np.interp(q, d, s) for q, d, s in zip(
+            flow, self._discharge_table, self._storage_table)])
+
+    @property
+    def storage(self):
+        """Volume stored in each reach now, in ft^3 or m^3."""
+        muskingum = self.K * (self.x * self.inflow + (1 - self.x) * self.outflow)
+        return np.where(self.level_pool, self._pool_storage, muskingum)
+
+    def _route_pool(self, reaches, inflow):
+        """Storage indication routing of level-pool reaches, all at once per step."""
+        out = np.empty(inflow.shape)
+        step = self._step[reaches]
+        inverse = np.divide(1, step, out=np.zeros_like(step), where=step > 0)
+        table = self._outflow_table[reaches].ravel()
+        base = np.arange(len(reaches)) * self._outflow_table.shape[1]
+        last = self._outflow_table.shape[1] - 2
+        previous = self.inflow[reaches]
+        N = 2 * self._pool_storage[reaches]/self.dt - self.outflow[reaches]
+        for t in range(len(inflow)):
+            current = inflow[t]
+            SI = previous + current + N
+            position = np.maximum(SI, 0) * inverse
+            i = np.minimum(position.astype(np.intp), last)
+            fraction = position - i
+            i += base
+            # Past the top of the table the last segment is extended.
+            O = table[i] + fraction * (table[i + 1] - table[i])
+            out[t] = O
+            N = SI - 2*O
+            previous = current
+        self._pool_storage[reaches] = (N + out[-1]) * self.dt/2
+        return out
+
+    def route(self, lateral):
+        """Routes one chunk of time steps.
+
+        Args:
+            lateral: Inflow entering each reach from outside the system, in
+                cfs or m^3/sec, shape (time steps, reaches) (or anything
+                that broadcasts to it).
+
+        Returns:
+            outflow: Outflow of each reach at each time step, same shape.
+
+        """
+        lateral = np.asarray(lateral, dtype=float)
+        steps = len(lateral)
+        reaches = len(self.downstream)
+        if steps == 0:
+            return np.empty((0, reaches))
+        # Reach by reach rows, so each reach's hydrograph is contiguous. Inflow
+        # starts as the lateral inflow; outflow is added downstream level by level.
+        inflow = np.array(np.broadcast_to(lateral, (steps, reaches)).T)
+        outflow = np.empty((reaches, steps))
+        for muskingum, pool, drains in self._levels:
+            for j in muskingum:
+                state = [self.C1[j] * self.inflow[j] + self.C2[j] * self.outflow[j]]
+                outflow[j] = signal.lfilter([self.C0[j], self.C1[j]], [1, -self.C2[j]],
+                                            inflow[j], zi=state)[0]
+            if len(pool):
+                outflow[pool] = self._route_pool(pool, inflow[pool].T).T
+            for j, down in drains:
+                inflow[down] += outflow[j]
+        self.inflow = inflow[:, -1].copy()
+        self.outflow = outflow[:, -1].copy()
+        return outflow.T
@@ -7,7 +7,11 @@ By Mike Lowry.
 3/25/2019
 
 """
-import numpy as np
+import functools
+import math
+
+from . import materials
+from ._lazy import numpy as np
 
 
 def rectangle_beam(base, height):
@@ -19,15 +23,15 @@ def rectangle_beam(base, height):
 
 def rod_beam(diameter):
     """Calculates moment of inertia for a rod beam."""
-    inertia = (np.pi * diameter**4)/64
+    inertia = (math.pi * diameter**4)/64
     y = diameter/2
     return inertia, y
 
 
 def pipe_beam(diameter, inside_diameter):
     """Calculates moment of inertia for a pipe beam."""
-    inertia = np.pi * (diameter**4 - inside_diameter**4)/64
-    y = diameter
+    inertia = math.pi * (diameter**4 - inside_diameter**4)/64
+    y = diameter/2
     return inertia, y
 
 
@@ -38,12 +42,98 @@ def eye_beam(base, height, depth, thickness):
     return inertia, y
 
 
+# =============================================================================
+# Section registry: precomputed properties of standard and custom shapes.
+# =============================================================================
+
+class Section:
+    """Precomputed properties of a beam cross section (inches)."""
+
+    __slots__ = ("designation", "area", "inertia", "y", "section_modulus")
+
+    def __init__(self, designation, area, inertia, y):
+        self.designation = designation
+        self.area = area
+        self.inertia = inertia
+        self.y = y
+        self.section_modulus = inertia/y
+
+    def __repr__(self):
+        return "Section({!r}, area={:.4g}, inertia={:.4g}, y={:.4g})".format(
+            self.designation, self.area, self.inertia, self.y)
+
+
+_shapes = {
+    "rectangle": (rectangle_beam, lambda base, height: base * height),
+    "rod": (rod_beam, lambda diameter: math.pi * diameter**2/4),
+    "pipe": (pipe_beam, lambda diameter, inside_diameter:
+             math.pi * (diameter**2 - inside_diameter**2)/4),
+    "eye": (eye_beam, lambda base, height, depth, thickness:
+            base * depth - (base - thickness) * height),
+}
+
+
+def _build_section(designation, shape, *dimensions):
+    """Computes a Section from a shape's beam function."""
+    inertia_function, area_function = _shapes[shape]
+    inertia, y = inertia_function(*dimensions)
+    return Section(designation, area_function(*dimensions), inertia, y)
+
+
+@functools.lru_cache(maxsize=4096)
+def custom_section(shape, *dimensions):
+    """Returns a cached Section for a shape and its dimensions.
+
+    Args:
+        shape: "rectangle", "rod", "pipe" or "eye".
+        *dimensions: Arguments of rectangle_beam, rod_beam, pipe_beam or
+            eye_beam in inches.
+
+    """
+    designation = "{}({})".format(shape, ", ".join(str(d) for d in dimensions))
+    return _build_section(designation, shape, *dimensions)
+
+
+# Dressed sizes of sawn lumber: nominal designation: (base, height).
+_lumber = {
+    "2x4": (1.5, 3.5), "2x6": (1.5, 5.5), "2x8": (1.5, 7.25),
+    "2x10": (1.5, 9.25), "2x12": (1.5, 11.25), "4x4": (3.5, 3.5),
+    "4x6": (3.5, 5.5), "4x8": (3.5, 7.25), "4x10": (3.5, 9.25),
+    "4x12": (3.5, 11.25), "6x6": (5.5, 5.5), "6x8": (5.5, 7.5),
+    "6x10": (5.5, 9.5), "6x12": (5.5, 11.5),
+}
+
+# Standard weight (schedule 40) steel pipe: (outside, inside diameter).
+_pipes = {
+    "Pipe1STD": (1.315, 1.049), "Pipe2STD": (2.375, 2.067),
+    "Pipe3STD": (3.5, 3.068), "Pipe4STD": (4.5, 4.026),
+    "Pipe6STD": (6.625, 6.065), "Pipe8STD": (8.625, 7.981),
+}
+
+sections = {}
+for _designation, _dimensions in _lumber.items():
+    sections[_designation] = _build_section(_designation, "rectangle", *_dimensions)
+for _designation, _dimensions in _pipes.items():
+    sections[_designation] = _build_section(_designation, "pipe", *_dimensions)
+
+
+def section(designation):
+    """Returns the registered Section for a designation such as "2x10"."""
+    if isinstance(designation, Section):
+        return designation
+    try:
+        return sections[designation]
+    except KeyError:
+        raise ValueError("Unknown section: {}".format(designation))
+
+
 def uniform_loaded_cantilever_beam(length, inertia, centroid_y, modulus_E, load):
     """Calculates maximum deflection and stress for cantilever beam.
     
     Args:
         length: Beam length in inches.
-        inertia: inches^4.
+        inertia: inches^4, or a section designation (e.g. "2x10") or
+            Section, in which case centroid_y can be None.
         centroid_y: inches
         modulus_E: psi.
         load: lbf-in.
@@ -53,6 +143,10 @@ def uniform_loaded_cantilever_beam(length, inertia, centroid_y, modulus_E, load)
         sigma: maximum stress
     
     """
+    if isinstance(inertia, (str, Section)):
+        properties = section(inertia)
+        inertia, centroid_y = properties.inertia, properties.y
+
     L = length
     y = centroid_y
     E = modulus_E
@@ -65,5 +159,76 @@ def uniform_loaded_cantilever_beam(length, inertia, centroid_y, modulus_E, load)
     return delta, sigma
 
 
+def section_properties(designations):
+    """Returns inertia and y arrays for an array of section designations."""
+    designations = np.asarray(designations)
+    names, inverse = np.unique(designations, return_inverse=True)
+    properties = np.array([(section(name).inertia, section(name).y) for name in names])
+    inverse = inverse.reshape(designations.shape)
+    return properties[inverse, 0], properties[inverse, 1]
+
 
+def cantilever_load_cases(length, sections, modulus_E, loads):
+    """Calculates deflection and stress for many members under many load cases.
 
+    All members and load cases are computed in one vectorized pass.
+
+    Args:
+        length: Member lengths in inches, shape (members,).
+        sections: Section designations, shape (members,), or a tuple of
+            (inertia, centroid_y) arrays.
+        modulus_E: psi, shape (members,) or a single value.
+        loads: Uniform loads in lbf-in, shape (cases,) for the same load
+            cases on every member or (members, cases).
+
+    Returns:
+        delta: maximum deflection in inches, shape (members, cases).
+        sigma: maximum stress, shape (members, cases).
+        governing_delta: Index of the load case with the largest
+            deflection for each member.
+        governing_sigma: Index of the load case with the largest stress for
+            each member.
+
+    """
+    if isinstance(sections, tuple):
+        inertia, y = (np.asarray(values, dtype=float) for values in sections)
+    else:
+        inertia, y = section_properties(sections)
+
+    member = np.s_[:, None]  # Members down the rows, load cases across.
+    length = np.asarray(length, dtype=float)
+    modulus_E = np.broadcast_to(np.asarray(modulus_E, dtype=float), length.shape)
+    delta, sigma = uniform_loaded_cantilever_beam(
+        length[member], inertia[member], y[member], modulus_E[member],
+        np.asarray(loads, dtype=float))
+    return (delta, sigma, np.argmax(np.abs(delta), axis=1),
+            np.argmax(np.abs(sigma), axis=1))
+
+
+def rectangle_cantilever_design(length, base, height, material, load, catalogue=None):
+    """Calculates deflection, stress and cost of rectangular cantilever beams.
+
+    Args:
+        length: Beam length in inches.
+        base: inches.
+        height: inches.
+        material: Material IDs or catalogue indexes (arrays broadcast).
+        load: lbf-in.
+        catalogue: materials.Catalogue. Default is materials.csv.
+
+    Returns:
+        delta: maximum deflection in inches
+        sigma: maximum stress
+        stress_ratio: sigma divided by the material's allowable stress.
+        cost: Beam cost (cost_rate is per ft^3, the beam in inches).
+
+    """
+    if catalogue is None:
+        catalogue = materials.catalogue()
+    material = catalogue.index(material)
+    inertia, y = rectangle_beam(base, height)
+    delta, sigma = uniform_loaded_cantilever_beam(
+        length, inertia, y, catalogue["modulus_E"][material], load)
+    stress_ratio = sigma / catalogue["allowable_stress"][material]
+    cost = length * base * height / 1728.0 * catalogue["cost_rate"][material]
+    return delta, sigma, stress_ratio, cost
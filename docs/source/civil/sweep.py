@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Design sweep module.
+
+Searches grids of design parameters for the cheapest designs that pass
+constraint checks, like Problems 2 and 3 of Python Assignment 1.2 but for
+much larger grids. The grid is never built in full: it is split into chunks
+of flat indexes, each chunk is evaluated as arrays in a worker process, and
+only the best k designs of every chunk are sent back and merged.
+
+Example (Problem 3, on Windows keep this under ``if __name__ == "__main__":``):
+
+    >>> import numpy as np
+    >>> from civil import materials
+    >>> from civil import sweep
+    >>> catalogue = materials.catalogue()
+    >>> grid = {"material": catalogue.index(["plastic", "brick", "concrete"]),
+    ...         "B": np.arange(1, 4.5, 0.5),
+    ...         "H": np.arange(6, 12.5, 0.5)}
+    >>> best = sweep.sweep(sweep.retaining_wall, grid,
+    ...                    constraints=[("SFOS", ">=", 1.5), ("OFOS", ">=", 1.5)],
+    ...                    k=3, length=50, gamma_soil=100, phi=np.deg2rad(30),
+    ...                    mu=0.7, load=25)
+    >>> best[0]["cost"]
+
+"""
+
+from concurrent import futures
+import functools
+import os
+
+import numpy as np
+
+from . import geotech
+from . import structures
+
+comparisons = {
+    ">=": np.greater_equal,
+    ">": np.greater,
+    "<=": np.less_equal,
+    "<": np.less,
+}
+
+
+def beam(b, h, length, load, modulus_E, cost_rate):
+    """Evaluates rectangular cantilever beam designs (Assignment 1.2, Problem 2).
+
+    Args:
+        b: Beam base in inches.
+        h: Beam height in inches.
+        length: Beam length in inches.
+        load: Uniform load in lb/in.
+        modulus_E: psi.
+        cost_rate: Cost per unit volume.
+
+    Returns:
+        results: Dictionary of delta, sigma and cost arrays.
+
+    """
+    inertia, y = structures.rectangle_beam(b, h)
+    delta, sigma = structures.uniform_loaded_cantilever_beam(length, inertia, y, modulus_E, load)
+    cost = length * b * h * cost_rate
+    return {"delta": delta, "sigma": sigma, "cost": cost}
+
+
+def retaining_wall(B, H, material, length, gamma_soil, phi, mu, load,
+                   catalogue=None):
+    """Evaluates gravity retaining wall designs (Assignment 1.2, Problem 3).
+
+    Args:
+        B: Wall base in feet.
+        H: Wall height in feet.
+        material: Material catalogue indexes.
+        length: Wall length in feet.
+        gamma_soil: Specific weight of soil.
+        phi: Soil friction angle in radians.
+        mu: Soil friction.
+        load: Additional load on soil behind the wall.
+        catalogue: materials.Catalogue. Default is materials.csv.
+
+    Returns:
+        results: Dictionary of SFOS, OFOS and cost arrays.
+
+    """
+    SFOS, OFOS, cost = geotech.gravity_retaining_wall_design(
+        B, H, material, gamma_soil, phi, mu, load, length, catalogue)
+    return {"SFOS": SFOS, "OFOS": OFOS, "cost": cost}
+
+
+def material_beam(b, h, material, length, load, catalogue=None):
+    """Evaluates rectangular cantilever beams made of catalogue materials.
+
+    Returns:
+        results: Dictionary of delta, sigma, stress_ratio and cost arrays.
+
+    """
+    delta, sigma, stress_ratio, cost = structures.rectangle_cantilever_design(
+        length, b, h, material, load, catalogue)
+    return {"delta": delta, "sigma": sigma, "stress_ratio": stress_ratio, "cost": cost}
+
+
+def _best(designs, objective, k):
+    """Returns the k designs with the smallest objective, sorted."""
+    if len(designs) > k:
+        keep = np.argpartition(designs[objective], k - 1)[:k]
+        designs = designs[keep]
+    return designs[np.argsort(designs[objective], kind="stable")]
+
+
+def _merge(best, designs, objective, k):
+    """Merges a chunk's best designs into the running best k."""
+    if len(best) == 0:
+        return designs
+    return _best(np.concatenate([best, designs]).view(np.recarray), objective, k)
+
+
+def _evaluate_chunk(evaluate, names, axes, constraints, objective, k, fixed, chunk):
+    """Evaluates one chunk of the flattened grid and keeps its best k designs."""
+    start, stop = chunk
+    indexes = np.unravel_index(np.arange(start, stop), [len(axis) for axis in axes])
+    params = {name: axis[index] for name, axis, index in zip(names, axes, indexes)}
+    results = evaluate(**params, **fixed)
+
+    passed = np.ones(stop - start, dtype=bool)
+    for name, comparison, limit in constraints:
+        passed &= comparisons[comparison](results[name], limit)
+
+    columns = dict(params)
+    columns.update(results)
+    columns = {name: np.broadcast_to(value, passed.shape)[passed]
+               for name, value in columns.items()}
+    designs = np.rec.fromarrays(list(columns.values()), names=list(columns))
+    return _best(designs, objective, k)
+
+
+def sweep(evaluate, grid, constraints=(), objective="cost", k=10,
+          chunk_size=100000, processes=None, **fixed):
+    """Finds the k best designs in a grid of parameters.
+
+    Args:
+        evaluate: Module-level function (so it can be sent to worker
+            processes) taking the grid and fixed parameters as keyword arrays
+            and returning a dictionary of result arrays, e.g. beam().
+        grid: Dictionary of parameter name to 1-D array of values.
+        constraints: (result name, comparison, limit) tuples, e.g.
+            ("SFOS", ">=", 1.5). Comparisons are >=, >, <= and <.
+        objective: Result to minimize. Default is cost.
+        k: Number of designs to return.
+        chunk_size: Grid points evaluated per chunk.
+        processes: Worker processes. Default is the CPU count; 1 runs in
+            this process.
+        **fixed: Parameters that are the same for every design.
+
+    Returns:
+        designs: Record array of the best designs (grid parameters and
+            results), sorted by objective. Fewer than k if fewer pass (empty,
+            with the same fields, if none do or the grid is empty).
+
+    """
+    names = list(grid)
+    axes = [np.asarray(grid[name]) for name in names]
+    total = int(np.prod([len(axis) for axis in axes]))
+    # An empty grid still gets one (empty) chunk, so the result has its dtype.
+    chunks = ((start, min(start + chunk_size, total))
+              for start in range(0, max(total, 1), chunk_size))
+    task = functools.partial(_evaluate_chunk, evaluate, names, axes,
+                             tuple(constraints), objective, k, fixed)
+
+    best = []
+    if processes == 1:
+        for chunk in chunks:
+            best = _merge(best, task(chunk), objective, k)
+        return best
+
+    processes = processes or os.cpu_count()
+    with futures.ProcessPoolExecutor(processes) as pool:
+        # Keep a few chunks per worker in flight instead of queueing them all.
+        running = set()
+        for chunk in chunks:
+            running.add(pool.submit(task, chunk))
+            if len(running) >= 2 * processes:
+                done, running = futures.wait(running, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    best = _merge(best, future.result(), objective, k)
+        for future in futures.as_completed(running):
+            best = _merge(best, future.result(), objective, k)
+    return best
+
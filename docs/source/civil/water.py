@@ -8,19 +8,54 @@ Provides functions for water engineering analysis and design.
 
 """
 
-import numpy as np
+import math
+import os
+
+from ._lazy import is_scalar
+from ._lazy import numpy as np
 
 minimum_velocity = 2.5  # Below this velocity plants might begin to grow (ft/s). 
 maximum_velocity = 6.0  # Above this scouring damage might occur (ft/s). 
+depth_rounding = 1e-12  # Pipe depths this far (relative) outside 0 to D are rounding, not overfill.
+
+
+def _pipe_cos_half(r, depth):
+    """Returns (r - depth)/r, the cosine of half the wetted angle.
+
+    Values just outside -1 to 1 from rounding are clipped; overfull depths
+    are left outside, so arccos gives NaN for them.
+    """
+    cos_half = np.divide(np.subtract(r, depth), r)
+    rounding = np.abs(cos_half) <= 1 + 2 * depth_rounding
+    return np.where(rounding, np.clip(cos_half, -1, 1), cos_half)
 
 
-def pipe(diameter, depth=None):
-    """Calculates wetted perimeter and hydraulic radius in a pipe."""  
+def pipe(diameter, depth=None, fast=False):
+    """Calculates wetted perimeter and hydraulic radius in a pipe.
+
+    With fast=True the values are interpolated from pipe_table() instead of
+    recomputing arccos/sin for every depth.
+
+    """  
     if depth is None:  
         depth = diameter # Pipe flowing full.
+
+    if fast:
+        P, Rh = pipe_ratios(np.divide(depth, diameter), columns=(1, 2))
+        return P * diameter, Rh * diameter
         
     r = diameter/2
-    theta = 2 * np.arccos((r-depth)/r)
+    if is_scalar(diameter, depth):
+        cos_half = (r-depth)/r
+        if not abs(cos_half) <= 1 + 2 * depth_rounding:
+            return math.nan, math.nan  # Overfull (or negative) depth.
+        theta = 2 * math.acos(min(max(cos_half, -1), 1))
+        A = ((r**2) * (theta - math.sin(theta)))/2  # Water flow area.
+        P = theta * r
+        Rh = A/P if P else math.nan
+        return P, Rh
+
+    theta = 2 * np.arccos(_pipe_cos_half(r, depth))
     A = ((r**2) * (theta - np.sin(theta)))/2  # Water flow area.
     P = theta * r  
     Rh = A/P  
@@ -34,20 +69,28 @@ def rectangle_channel(width, depth):
     return P, Rh
 
 
+def _sin_cos(theta_degrees):
+    """Returns sine and cosine of an angle in degrees (math for scalars)."""
+    if is_scalar(theta_degrees):
+        theta_radians = math.radians(theta_degrees)
+        return math.sin(theta_radians), math.cos(theta_radians)
+    theta_radians = np.radians(theta_degrees)
+    return np.sin(theta_radians), np.cos(theta_radians)
+
+
 def trapezoid_channel(base, theta_degrees, depth):
     """Calculates wetted perimeter and hydraulic radius in a trapezoid channel."""
-    theta_radians = np.radians(theta_degrees)
-    P = base + 2 * (depth/np.sin(theta_radians))  
-    Rh = (base * depth * np.sin(theta_radians) + 
-          depth**2 * np.cos(theta_radians)) / (base * np.sin(theta_radians) + 2 * depth)
+    sin, cos = _sin_cos(theta_degrees)
+    P = base + 2 * (depth/sin)  
+    Rh = (base * depth * sin + depth**2 * cos) / (base * sin + 2 * depth)
     return P, Rh
 
 
 def triangle_channel(theta_degrees, depth):
     """Calculates wetted perimeter and hydraulic radius in a triangle channel."""
-    theta_radians = np.radians(theta_degrees)
-    P = (2 * depth)/np.sin(theta_radians)  
-    Rh = (depth * np.cos(theta_radians)) / 2
+    sin, cos = _sin_cos(theta_degrees)
+    P = (2 * depth)/sin  
+    Rh = (depth * cos) / 2
     return P, Rh
 
 
@@ -85,3 +128,434 @@ def velocity_and_flow(wetted_perimeter, hydraulic_radius, slope, roughness_n, un
 
     return v, Q
 
+
+# =============================================================================
+# Dimensionless rating table for partially full circular pipes.
+# =============================================================================
+
+pipe_table_size = 1025  # Points per half of the table (lower and upper).
+pipe_table_columns = ("A/D^2", "P/D", "Rh/D", "A*Rh^(2/3)/D^(8/3)")
+_pipe_tables = {}
+
+
+def _pipe_exact(ratio):
+    """Calculates the dimensionless pipe columns exactly for depth ratios d/D."""
+    theta = 2 * np.arccos(np.clip(1 - 2 * ratio, -1, 1))
+    area = (theta - np.sin(theta))/8
+    perimeter = theta/2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        radius = np.where(perimeter > 0, area/perimeter, 0.0)
+    return np.stack([area, perimeter, radius, area * radius**(2/3)], axis=-1)
+
+
+def _pipe_cache_path(size):
+    """Returns the file used to cache the pipe table on disk."""
+    folder = os.environ.get("CIVIL_CACHE_DIR",
+                            os.path.join(os.path.expanduser("~"), ".cache", "civil"))
+    return os.path.join(folder, "pipe_table_{}.npz".format(size))
+
+
+def pipe_table(size=pipe_table_size):
+    """Returns the dimensionless d/D table for partially full pipes.
+
+    The table is built once, cached on disk (folder CIVIL_CACHE_DIR, default
+    ~/.cache/civil) and kept in memory afterwards. Each half of the pipe is
+    tabulated against u = sqrt(d/D) below half full and u = sqrt(1 - d/D)
+    above, which removes the square-root behaviour at the invert and crown so
+    linear interpolation stays accurate everywhere.
+
+    Returns:
+        table: Array (2, size, 4) of the pipe_table_columns for each half.
+        error: Largest interpolation error of each column (checked at the
+            midpoint of every table interval).
+
+    """
+    if size in _pipe_tables:
+        return _pipe_tables[size]
+
+    path = _pipe_cache_path(size)
+    try:
+        with np.load(path) as saved:
+            _pipe_tables[size] = saved["table"], saved["error"]
+            return _pipe_tables[size]
+    except (OSError, KeyError, ValueError):
+        pass
+
+    u = np.linspace(0, np.sqrt(0.5), size)
+    table = np.stack([_pipe_exact(u**2), _pipe_exact(1 - u**2)])
+
+    # Bound the error at the middle of every interval, the worst case for
+    # linear interpolation.
+    middle = (u[:-1] + u[1:])/2
+    exact = np.stack([_pipe_exact(middle**2), _pipe_exact(1 - middle**2)])
+    linear = (table[:, :-1] + table[:, 1:])/2
+    error = np.abs(linear - exact).max(axis=(0, 1))
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = "{}.{}.tmp".format(path, os.getpid())
+        with open(temporary, "wb") as file:
+            np.savez(file, table=table, error=error)
+        os.replace(temporary, path)
+    except OSError:
+        pass  # The table still works, it just isn't cached on disk.
+
+    _pipe_tables[size] = table, error
+    return table, error
+
+
+def pipe_ratios(ratio, columns=(0, 1, 2, 3), size=pipe_table_size):
+    """Interpolates the dimensionless pipe table for depth ratios d/D.
+
+    Args:
+        ratio: Depth divided by diameter. Ratios outside 0-1 by more than
+            rounding (overfull pipes) give NaN.
+        columns: Indexes of the pipe_table_columns to return.
+
+    Returns:
+        ratios: Tuple with one array per requested column.
+
+    """
+    table, _ = pipe_table(size)
+    values = table.reshape(-1, table.shape[-1]).T  # One row per column.
+    slopes = np.diff(values, axis=1)
+    shape = np.shape(ratio)
+    x = np.asarray(ratio, dtype=float).ravel()
+    inside = (x >= -depth_rounding) & (x <= 1 + depth_rounding)
+    x = np.where(inside, np.clip(x, 0, 1), np.nan)
+    upper = x > 0.5
+
+    # Position along the table; NaN ratios stay NaN through the fraction.
+    position = np.minimum(x, 1 - x)
+    np.sqrt(position, out=position)
+    position *= (size - 1)/np.sqrt(0.5)
+    with np.errstate(invalid="ignore"):
+        i = position.astype(np.intp)
+    np.clip(i, 0, size - 2, out=i)
+    fraction = np.subtract(position, i, out=position)
+    np.add(i, size, out=i, where=upper)  # Upper half of the pipe.
+
+    ratios = []
+    for column in columns:
+        ratio = values[column].take(i)
+        ratio += fraction * slopes[column].take(i)
+        ratios.append(ratio.reshape(shape)[()])
+    return tuple(ratios)
+
+
+def pipe_velocity_and_flow(diameter, depth, slope, roughness_n, units="US", fast=False):
+    """Calculates flow and velocity of water in a partially full pipe.
+
+    Same result as velocity_and_flow(*pipe(diameter, depth), ...). With
+    fast=True the geometry and the Rh^(2/3) term come from pipe_table().
+
+    Args:
+        diameter: Pipe diameter in inches or cm.
+        depth: Depth of water in inches or cm.
+        slope: Slope of the pipe in ft/ft or m/m
+        roughness_n: Manning's roughness coefficient for pipe material.
+        units: US or SI. Default is US.
+
+    Returns:
+        v: Velocity in ft/s or m/sec
+        Q: Flow in cfs or m^3/sec
+
+    """
+    if not fast:
+        P, Rh = pipe(diameter, depth)
+        return velocity_and_flow(P, Rh, slope, roughness_n, units)
+
+    if units=="US":
+        c = 1.49  # Conversion constant.
+        D = np.divide(diameter, 12)
+    else:
+        c = 1.00
+        D = np.divide(diameter, 100)
+
+    if depth is None:
+        depth = diameter # Pipe flowing full.
+    A, conveyance = pipe_ratios(np.divide(depth, diameter), columns=(0, 3))
+    Q = c/roughness_n * np.sqrt(slope) * D**(8/3) * conveyance
+    with np.errstate(invalid="ignore", divide="ignore"):
+        v = Q / (A * D**2)
+    return v, Q
+
+
+# =============================================================================
+# Batch functions for many sections and depths at once.
+# =============================================================================
+
+section_kinds = {"pipe": 0, "rectangle": 1, "trapezoid": 2, "triangle": 3}
+
+
+def _section_dtype():
+    """Returns the structured dtype of the sections() array."""
+    return np.dtype([("kind", "i1"), ("size", "f8"), ("theta_degrees", "f8")])
+
+
+def __getattr__(name):
+    """Creates section_dtype on first use so importing stays NumPy free."""
+    if name == "section_dtype":
+        return _section_dtype()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def sections(kind, size=0.0, theta_degrees=90.0):
+    """Creates a structured array of cross sections for the batch functions.
+
+    Args:
+        kind: "pipe", "rectangle", "trapezoid", "triangle" (or an array of them).
+        size: Pipe diameter, rectangle width or trapezoid base in inches or cm.
+        theta_degrees: Side slope angle of trapezoid and triangle channels.
+
+    Returns:
+        sections: Structured array with fields kind, size and theta_degrees.
+
+    """
+    kind = np.asarray(kind)
+    names, inverse = np.unique(kind, return_inverse=True)
+    for name in names:
+        if name not in section_kinds:
+            raise ValueError("Unknown section kind: {}".format(name))
+    codes = np.array([section_kinds[name] for name in names])[inverse]
+    codes = codes.reshape(kind.shape)
+
+    shape = np.broadcast_shapes(codes.shape, np.shape(size), np.shape(theta_degrees))
+    result = np.empty(shape, dtype=_section_dtype())
+    result["kind"] = codes
+    result["size"] = size
+    result["theta_degrees"] = theta_degrees
+    return result
+
+
+def batch_geometry(sections, depth, fast=False):
+    """Calculates wetted perimeter, hydraulic radius and area for many sections.
+
+    The sections and depths are broadcast against each other, so a grid of
+    diameters x depths is computed in one pass (see numpy.ix_). A depth of
+    NaN means a pipe flowing full.
+
+    Args:
+        sections: Structured array from sections().
+        depth: Depth of water in inches or cm.
+        fast: Interpolate pipes from pipe_table() instead of using trig.
+
+    Returns:
+        P: Wetted perimeter.
+        Rh: Hydraulic radius.
+        A: Water flow area.
+
+    """
+    kind, size, theta_degrees, depth = np.broadcast_arrays(
+        sections["kind"], sections["size"], sections["theta_degrees"],
+        np.asarray(depth, dtype=float))
+    P = np.empty(kind.shape)
+    Rh = np.empty(kind.shape)
+    A = np.empty(kind.shape)
+
+    # One vectorized pass per section kind that is present.
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for code in np.unique(kind):
+            mask = kind == code
+            b = size[mask]
+            d = depth[mask]
+            theta_radians = np.radians(theta_degrees[mask])
+            if code == section_kinds["pipe"]:
+                r = b/2
+                d = np.where(np.isnan(d), b, d)  # Pipe flowing full.
+                if fast:
+                    area, perimeter, radius = pipe_ratios(d/b, columns=(0, 1, 2))
+                    A[mask] = area * b**2
+                    P[mask] = perimeter * b
+                    Rh[mask] = radius * b
+                    continue
+                theta = 2 * np.arccos(_pipe_cos_half(r, d))
+                A[mask] = ((r**2) * (theta - np.sin(theta)))/2
+                P[mask] = theta * r
+                Rh[mask] = A[mask]/P[mask]
+            elif code == section_kinds["rectangle"]:
+                A[mask] = d * b
+                P[mask] = 2 * d + b
+                Rh[mask] = (d * b) / (b + 2 * d)
+            elif code == section_kinds["trapezoid"]:
+                A[mask] = b * d + d**2 / np.tan(theta_radians)
+                P[mask] = b + 2 * (d/np.sin(theta_radians))
+                Rh[mask] = (b * d * np.sin(theta_radians) + d**2 * np.cos(theta_radians)) / (
+                    b * np.sin(theta_radians) + 2 * d)
+            else:
+                A[mask] = d**2 / np.tan(theta_radians)
+                P[mask] = (2 * d)/np.sin(theta_radians)
+                Rh[mask] = (d * np.cos(theta_radians)) / 2
+    return P, Rh, A
+
+
+def batch_flow(sections, depth, slope, roughness_n, units="US", fast=False):
+    """Calculates geometry, velocity and flow for many sections at once.
+
+    Sections, depths, slopes and roughness values are broadcast against each
+    other, e.g. diameters x depths x slopes x n with numpy.ix_.
+
+    Args:
+        sections: Structured array from sections().
+        depth: Depth of water in inches or cm.
+        slope: Slope of the pipe in ft/ft or m/m
+        roughness_n: Manning's roughness coefficient for pipe material.
+        units: US or SI. Default is US.
+        fast: Interpolate pipes from pipe_table() instead of using trig.
+
+    Returns:
+        P: Wetted perimeter in inches or cm.
+        Rh: Hydraulic radius in inches or cm.
+        A: Water flow area in inches^2 or cm^2.
+        v: Velocity in ft/s or m/sec
+        Q: Flow in cfs or m^3/sec
+
+    """
+    P, Rh, A = batch_geometry(sections, depth, fast)
+    with np.errstate(invalid="ignore"):
+        v, Q = velocity_and_flow(P, Rh, slope, roughness_n, units)
+    return P, Rh, A, v, Q
+
+
+# =============================================================================
+# Normal depth (inverse Manning) for many sections at once.
+# =============================================================================
+
+pipe_max_flow_ratio = 0.938181215743356  # d/D where a pipe carries the most flow.
+
+
+def _section_terms(kind, size, theta_degrees, depth):
+    """Calculates area, wetted perimeter, top width and dP/d(depth).
+
+    Works on flat arrays of section fields, one vectorized pass per kind.
+    """
+    A = np.empty(depth.shape)
+    P = np.empty(depth.shape)
+    T = np.empty(depth.shape)
+    dP = np.empty(depth.shape)
+
+    for code in np.unique(kind):
+        mask = kind == code
+        b = size[mask]
+        d = depth[mask]
+        theta_radians = np.radians(theta_degrees[mask])
+        if code == section_kinds["pipe"]:
+            r = b/2
+            theta = 2 * np.arccos(np.clip((r-d)/r, -1, 1))
+            half_sin = np.sin(theta/2)
+            A[mask] = ((r**2) * (theta - np.sin(theta)))/2
+            P[mask] = theta * r
+            T[mask] = 2 * r * half_sin
+            with np.errstate(divide="ignore"):
+                dP[mask] = 2 / half_sin
+        elif code == section_kinds["rectangle"]:
+            A[mask] = d * b
+            P[mask] = 2 * d + b
+            T[mask] = b
+            dP[mask] = 2
+        else:
+            if code == section_kinds["triangle"]:
+                b = 0
+            cotangent = 1/np.tan(theta_radians)
+            A[mask] = b * d + d**2 * cotangent
+            P[mask] = b + 2 * (d/np.sin(theta_radians))
+            T[mask] = b + 2 * d * cotangent
+            dP[mask] = 2/np.sin(theta_radians)
+    return A, P, T, dP
+
+
+def normal_depth(flow, sections, slope, roughness_n, units="US",
+                 tolerance=1e-10, max_iterations=100):
+    """Calculates the normal depth that carries a flow, for many sections at once.
+
+    Uses a bracketed Newton/bisection hybrid on whole arrays: every section
+    takes a Newton step when it stays inside its bracket and bisects
+    otherwise. Pipes are bracketed below pipe_max_flow_ratio, so near full
+    the lower of the two possible depths is returned. Flows above the
+    largest a pipe can carry return NaN (surcharged).
+
+    Args:
+        flow: Flow in cfs or m^3/sec
+        sections: Structured array from sections().
+        slope: Slope of the pipe in ft/ft or m/m
+        roughness_n: Manning's roughness coefficient for pipe material.
+        units: US or SI. Default is US.
+        tolerance: Convergence tolerance relative to the section size.
+        max_iterations: Maximum number of Newton/bisection iterations.
+
+    Returns:
+        depth: Normal depth in inches or cm.
+        iterations: Number of iterations used by the slowest section.
+
+    """
+    if units=="US":
+        c = 1.49  # Conversion constant.
+        scale = 12
+    else:
+        c = 1.00
+        scale = 100
+
+    Q, kind, size, theta_degrees, S, n = np.broadcast_arrays(
+        np.asarray(flow, dtype=float), sections["kind"], sections["size"],
+        sections["theta_degrees"], np.asarray(slope, dtype=float),
+        np.asarray(roughness_n, dtype=float))
+    shape = Q.shape
+    Q, kind, size, theta_degrees, S, n = (np.ravel(a) for a in
+                                           (Q, kind, size, theta_degrees, S, n))
+    K = c/n * np.sqrt(S) / scale**(8/3)  # Q = K * A^(5/3) / P^(2/3)
+
+    def flow_and_slope(i, d):
+        """Returns Q(d) - Q and dQ/dd for the sections at indexes i."""
+        A, P, T, dP = _section_terms(kind[i], size[i], theta_degrees[i], d)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            q = K[i] * A**(5/3) / P**(2/3)
+            dq = q * (5/3 * T/A - 2/3 * dP/P)
+        return np.nan_to_num(q) - Q[i], dq
+
+    # Brackets: Q(low) <= Q <= Q(high).
+    pipe = kind == section_kinds["pipe"]
+    low = np.zeros(Q.shape)
+    high = np.where(pipe, pipe_max_flow_ratio * size, np.where(size > 0, size, 1.0))
+    length = np.where(size > 0, size, high)  # Scale for the tolerance.
+
+    # Grow open channel brackets until they carry the flow.
+    index = np.flatnonzero(~pipe)
+    for _ in range(max_iterations):
+        if index.size == 0:
+            break
+        short = flow_and_slope(index, high[index])[0] < 0
+        index = index[short]
+        high[index] *= 2
+
+    depth = np.full(Q.shape, np.nan)
+    f_high = flow_and_slope(np.arange(Q.size), high)[0]
+    solvable = (Q >= 0) & (f_high >= 0)
+    depth[solvable & (Q == 0)] = 0
+
+    index = np.flatnonzero(solvable & (Q > 0))
+    d = (low[index] + high[index])/2
+    iterations = 0
+    while index.size and iterations < max_iterations:
+        iterations += 1
+        f, df = flow_and_slope(index, d)
+
+        # Shrink the brackets around the root.
+        below = f < 0
+        low[index[below]] = d[below]
+        high[index[~below]] = d[~below]
+
+        # Newton step, or bisection if it leaves the bracket.
+        with np.errstate(invalid="ignore", divide="ignore"):
+            step = d - f/df
+        lo, hi = low[index], high[index]
+        outside = ~((step > lo) & (step < hi))
+        step[outside] = (lo[outside] + hi[outside])/2
+        step[f == 0] = d[f == 0]  # Exact root.
+
+        done = np.abs(step - d) <= tolerance * length[index]
+        depth[index[done]] = step[done]
+        index = index[~done]
+        d = step[~done]
+
+    depth[index] = d  # Not converged within max_iterations.
+    return depth.reshape(shape)[()], iterations
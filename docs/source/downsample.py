@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""Downsample module.
+
+Plots very long time series (e.g. minute-resolution gas temperature logs
+with tens of millions of points) quickly. A line can't show more detail
+than the axes have pixels, so the data is decimated to a few points per
+pixel before it is handed to matplotlib:
+
+- min-max keeps the smallest and largest value of each bucket, so peaks
+  and dips are never lost;
+- LTTB (largest triangle three buckets) keeps the point of each bucket
+  that best preserves the shape of the line.
+
+A pyramid of min-max levels is built once per series and cached, so when
+the plot is zoomed or panned only the visible part of the best level is
+decimated again.
+
+    >>> import downsample
+    >>> line = downsample.plot(df['Time_Minutes'], df['Gas1'])
+    >>> plt.xlabel("Time")
+    >>> plt.show()
+
+"""
+
+import numpy as np
+
+base_width = 64  # Points per min-max bucket of the first cached level.
+level_factor = 8  # Each higher level has 1/level_factor of the points of the one below.
+points_per_pixel = 2
+
+
+def _minmax_indices(y, width):
+    """Returns the sorted indexes of the min and max of each bucket of width points."""
+    n = len(y)
+    full = n//width * width
+    blocks = y[:full].reshape(-1, width)
+    low = blocks.argmin(axis=1)
+    high = blocks.argmax(axis=1)
+    if np.isnan(blocks[np.arange(len(blocks)), low]).any():  # argmin stops at NaN.
+        low = np.where(np.isnan(blocks), np.inf, blocks).argmin(axis=1)
+        high = np.where(np.isnan(blocks), -np.inf, blocks).argmax(axis=1)
+    starts = np.arange(0, full, width)
+    indexes = np.stack([starts + np.minimum(low, high), starts + np.maximum(low, high)], axis=1)
+    indexes = indexes.ravel()
+    if full < n:
+        rest = y[full:]
+        finite = ~np.isnan(rest)
+        if finite.any():
+            ends = np.flatnonzero(finite)[[np.nanargmin(rest[finite]), np.nanargmax(rest[finite])]]
+            indexes = np.concatenate([indexes, full + np.sort(ends)])
+    return indexes
+
+
+def minmax(x, y, n_out):
+    """Decimates a line to about n_out points, keeping each bucket's min and max.
+
+    Args:
+        x: Sorted x values.
+        y: y values.
+        n_out: Number of points wanted (two per bucket).
+
+    Returns:
+        x, y: Decimated arrays, still in x order.
+
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    width = int(np.ceil(2 * len(y)/max(n_out, 2)))
+    if width <= 2:
+        return x, y
+    indexes = _minmax_indices(y, width)
+    return x[indexes], y[indexes]
+
+
+def lttb(x, y, n_out):
+    """Decimates a line to n_out points with largest triangle three buckets.
+
+    The first and last points are kept. The points in between are split
+    into n_out - 2 buckets, and from each bucket the point making the
+    largest triangle with the point kept from the previous bucket and the
+    mean of the next bucket is kept.
+
+    Args:
+        x: Sorted x values.
+        y: y values.
+        n_out: Number of points wanted.
+
+    Returns:
+        x, y: Decimated arrays, still in x order. A bucket of only NaN
+            values keeps its first point, so gaps stay gaps.
+
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    finite = ~np.isnan(y)
+    counts = np.add.reduceat(finite.astype(np.intp), edges)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = np.add.reduceat(np.where(finite, x, 0), edges)/counts
+        mean_y = np.add.reduceat(np.where(finite, y, 0), edges)/counts
+    # A bucket with no finite points borrows the means of the next one that
+    # has some (or of the last one, at the end).
+    filled = np.flatnonzero(counts)
+    if len(filled):
+        source = np.minimum(np.searchsorted(filled, np.arange(len(counts))), len(filled) - 1)
+        mean_x, mean_y = mean_x[filled[source]], mean_y[filled[source]]
+
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = np.argmax(finite)  # The triangles start from the first finite point.
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        if stop > start and counts[i]:
+            area = np.abs((x[a] - mean_x[i + 1]) * (y[start:stop] - y[a])
+                          - (x[a] - x[start:stop]) * (mean_y[i + 1] - y[a]))
+            a = start + np.nanargmax(area)
+            selected[i + 1] = a
+        else:
+            selected[i + 1] = start  # All NaN: keep a NaN so the line shows the gap.
+    return x[selected], y[selected]
+
+
+class DecimationCache:
+    """Min-max levels of a long series, for fast decimation of any x range.
+
+    Args:
+        x: Sorted x values (numbers).
+        y: y values.
+        smallest: Stop adding levels once a level has fewer points than this.
+
+    """
+
+    def __init__(self, x, y, smallest=10000):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        if np.any(self.x[1:] < self.x[:-1]):
+            order = np.argsort(self.x, kind="stable")
+            self.x = self.x[order]
+            self.y = self.y[order]
+
+        # levels[0] is the full series; each level is min-max of the one below.
+        self.levels = [(self.x, self.y)]
+        width = base_width  # argmin is much faster on wide rows than narrow ones.
+        while len(self.levels[-1][0]) > smallest:
+            x_level, y_level = self.levels[-1]
+            indexes = _minmax_indices(y_level, width)
+            width = 2 * level_factor
+            self.levels.append((x_level[indexes], y_level[indexes]))
+
+    def view(self, x_min, x_max, n_out, method="minmax"):
+        """Returns about n_out points covering x_min to x_max.
+
+        Args:
+            x_min, x_max: Visible x range.
+            n_out: Number of points wanted (e.g. 2 per pixel).
+            method: "minmax" or "lttb".
+
+        Returns:
+            x, y: Decimated arrays, with one extra point on each side so the
+                line reaches the edges of the axes.
+
+        """
+        for x_level, y_level in reversed(self.levels):
+            start = max(np.searchsorted(x_level, x_min, "left") - 1, 0)
+            stop = min(np.searchsorted(x_level, x_max, "right") + 1, len(x_level))
+            if stop - start >= 2 * n_out or x_level is self.x:
+                break
+        x_view, y_view = x_level[start:stop], y_level[start:stop]
+        if method == "lttb":
+            # LTTB is a Python loop over buckets, so min-max first.
+            x_view, y_view = minmax(x_view, y_view, 4 * n_out)
+            return lttb(x_view, y_view, n_out)
+        return minmax(x_view, y_view, n_out)
+
+
+class DecimatedLine:
+    """A matplotlib line that is decimated again whenever its x limits change."""
+
+    def __init__(self, ax, cache, method, line):
+        self.ax = ax
+        self.cache = cache
+        self.method = method
+        self.line = line
+        self._limits = None
+        ax.callbacks.connect("xlim_changed", self.update)
+        ax.figure.canvas.mpl_connect("resize_event", self.update)
+
+    def update(self, event=None):
+        """Decimates the visible range to the current axes width."""
+        x_min, x_max = self.ax.get_xlim()
+        pixels = max(int(self.ax.bbox.width), 100)
+        if self._limits == (x_min, x_max, pixels):
+            return
+        self._limits = (x_min, x_max, pixels)
+        self.line.set_data(*self.cache.view(x_min, x_max, points_per_pixel * pixels, self.method))
+        self.ax.figure.canvas.draw_idle()
+
+
+def plot(x, y, *args, ax=None, method="minmax", **kwargs):
+    """Plots y versus x like plt.plot, decimated to the resolution of the axes.
+
+    Args:
+        x: Sorted x values (numbers, datetimes or a pandas Series).
+        y: y values.
+        *args: Format string, passed to plot.
+        ax: Axes to plot on. Default is the current axes.
+        method: "minmax" (keeps peaks) or "lttb" (keeps shape).
+        **kwargs: Passed to plot, e.g. color or linewidth.
+
+    Returns:
+        line: DecimatedLine. line.line is the matplotlib Line2D.
+
+    """
+    import matplotlib.pyplot as plt
+
+    ax = ax or plt.gca()
+    x = np.asarray(x)
+    dates = np.issubdtype(x.dtype, np.datetime64)
+    if dates:
+        from matplotlib import dates as mdates
+
+        x = mdates.date2num(x)
+    cache = DecimationCache(x, y)
+
+    pixels = max(int(ax.bbox.width), 100)
+    x_view, y_view = cache.view(cache.x[0], cache.x[-1], points_per_pixel * pixels, method)
+    line, = ax.plot(x_view, y_view, *args, **kwargs)
+    if dates:
+        ax.xaxis_date()
+    return DecimatedLine(ax, cache, method, line)
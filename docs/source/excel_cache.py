@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Excel cache module.
+
+Provides a read-through cache for ``pd.read_excel``. Parsing a workbook
+with openpyxl is slow, and data_analysis.py reads the same sheets several
+times, so the first read of each sheet is saved as a Feather file (or a
+pickle when pyarrow is not installed). Later reads load the Feather file
+with memory mapping, and repeat reads in the same session reuse the
+DataFrame already in memory without copying its data.
+
+Entries are keyed on the workbook path, sheet and read_excel arguments, and
+validated against the workbook's modification time and size (or a SHA-256
+hash of its contents with validate="hash"). When the workbook changes, the
+next read parses it again and replaces the old entry.
+
+    >>> import excel_cache
+    >>> df = excel_cache.read_excel(my_data_file, sheet_name="Sheet1")
+
+"""
+
+import glob
+import hashlib
+import os
+
+import pandas as pd
+
+import frame_store
+
+default_cache_dir = os.environ.get(
+    "EXCEL_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "excel_cache"))
+_memory = {}
+
+
+def _file_hash(path):
+    """Returns the SHA-256 hash of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _keys(path, sheet_name, validate, kwargs):
+    """Returns (entry key, version key) for a sheet of a workbook."""
+    path = os.path.abspath(path)
+    entry = repr((path, sheet_name, sorted(kwargs.items())))
+    if validate == "hash":
+        version = _file_hash(path)
+    else:
+        stat = os.stat(path)
+        version = "{}-{}".format(stat.st_mtime_ns, stat.st_size)
+    entry = hashlib.sha1(entry.encode()).hexdigest()[:20]
+    return entry, hashlib.sha1(version.encode()).hexdigest()[:12]
+
+
+def _load(stem):
+    """Loads a cached DataFrame, or returns None if it isn't there."""
+    for path in (stem + ".feather", stem + ".pkl"):
+        if os.path.exists(path):
+            return frame_store.load(path)
+    return None
+
+
+def read_excel(path, sheet_name=0, cache_dir=None, validate="mtime", **kwargs):
+    """Reads one sheet of an Excel file through the cache.
+
+    Args:
+        path: Excel file.
+        sheet_name: Sheet name or index (one sheet).
+        cache_dir: Folder for cached sheets. Default is EXCEL_CACHE_DIR or
+            ~/.cache/excel_cache.
+        validate: "mtime" (modification time and size) or "hash" (contents).
+        **kwargs: Passed to pd.read_excel.
+
+    Returns:
+        df: DataFrame. It shares data with the cached copy, so adding or
+            replacing columns is fine but editing values in place is not.
+
+    """
+    if sheet_name is None or isinstance(sheet_name, list):
+        raise ValueError("read_excel caches one sheet at a time")
+    cache_dir = cache_dir or default_cache_dir
+    entry, version = _keys(path, sheet_name, validate, kwargs)
+    stem = os.path.join(cache_dir, "{}-{}".format(entry, version))
+
+    if stem in _memory:
+        return _memory[stem].copy(deep=False)
+
+    for old in [key for key in _memory if os.path.basename(key).startswith(entry)]:
+        del _memory[old]  # An older version of the same workbook sheet.
+
+    df = _load(stem)
+    if df is None:
+        df = pd.read_excel(path, sheet_name=sheet_name, **kwargs)
+        os.makedirs(cache_dir, exist_ok=True)
+        for old in glob.glob(os.path.join(cache_dir, entry + "-*")):
+            os.remove(old)
+        frame_store.save(df, stem)
+
+    _memory[stem] = df
+    return df.copy(deep=False)
+
+
+def clear_cache(cache_dir=None):
+    """Deletes all cached sheets, on disk and in memory."""
+    _memory.clear()
+    for name in glob.glob(os.path.join(cache_dir or default_cache_dir, "*")):
+        os.remove(name)
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""Extrema module.
+
+Finds the global minimum and maximum of a function over a range, and all
+its distinct local minima and maxima, instead of one local answer per
+start point like ``optimize.minimize(f, -1)`` and ``optimize.minimize(f, 3)``.
+
+1. A coarse grid is evaluated in one vectorized call of f.
+2. Grid points lower (higher) than all their neighbours seed local
+   searches for minima (maxima), so maxima need no ``f2 = -f`` function.
+3. Each seed is refined with a bounded local search (L-BFGS-B), in worker
+   processes if wanted, best seeds first, until all are done or the time
+   or evaluation budget runs out.
+4. Refined points closer than a tolerance are merged.
+
+Function values are cached, so searching for minima and maxima, or
+searching the same function again, doesn't repeat evaluations.
+
+    >>> import extrema
+    >>> def f(x):
+    ...     return -0.4*x**4 + 3 * x**3 + 0.9 * x**2 - 12 * x + 12
+    >>> minima, maxima = extrema.find_extrema(f, (-3, 5))
+    >>> minima[0]  # Global minimum on the range (here at the left end).
+    (-3., -57.3)
+    >>> maxima.x   # All local maxima, best first.
+    array([ 5.        , -1.13940362])
+
+"""
+
+from concurrent import futures
+import itertools
+import os
+import time
+
+import numpy as np
+from scipy import optimize
+
+
+class CachedFunction:
+    """Wraps f(x) so each point is only evaluated once.
+
+    Args:
+        f: Function of a number (1-D) or an array of shape (d,) (n-D).
+
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.cache = {}
+        self.evaluations = 0
+
+    def __call__(self, x):
+        key = np.asarray(x, dtype=float).tobytes()
+        if key not in self.cache:
+            self.cache[key] = float(self.f(x))
+            self.evaluations += 1
+        return self.cache[key]
+
+
+def _local(function, x0, bounds, sign, maxfun):
+    """Minimizes sign * f from x0 within bounds. Returns (x, f(x), cache, evaluations)."""
+    start = function.evaluations
+    one_d = len(bounds) == 1
+
+    def objective(x):
+        return sign * function(x[0] if one_d else x)
+
+    result = optimize.minimize(objective, x0, method="L-BFGS-B", bounds=bounds,
+                               options={"maxfun": max(maxfun, 1)})
+    return result.x, sign * result.fun, function.cache, function.evaluations - start
+
+
+def _grid_extrema(values, sign):
+    """Returns flat indexes of grid points no worse than all their axis neighbours."""
+    values = sign * values
+    best = np.ones(values.shape, dtype=bool)
+    for axis in range(values.ndim):
+        padded = np.pad(values, [(1, 1) if i == axis else (0, 0) for i in range(values.ndim)],
+                        constant_values=np.inf)
+        before = np.take(padded, np.arange(values.shape[axis]), axis=axis)
+        after = np.take(padded, np.arange(2, values.shape[axis] + 2), axis=axis)
+        best &= (values <= before) & (values <= after)
+    best &= ~np.isnan(values)
+    return np.flatnonzero(best)
+
+
+def _distinct(points, values, tolerance, sign):
+    """Merges points closer than tolerance, keeping the best of each group."""
+    order = np.argsort(sign * values, kind="stable")
+    kept = []
+    for i in order:
+        if all(np.max(np.abs(points[i] - points[j])) > tolerance for j in kept):
+            kept.append(i)
+    return kept
+
+
+def find_extrema(f, bounds, n=1000, kind="both", starts=20, vectorized=True,
+                 processes=1, max_evaluations=None, max_time=None, tolerance=None,
+                 cache=None):
+    """Finds the global and all local minima and maxima of f within bounds.
+
+    Args:
+        f: Function. 1-D: f(x) of a number. n-D: f(x) of an array of shape (d,).
+            With vectorized=True, f must also accept a whole grid at once: an
+            array (1-D) or an array of shape (d, ...) (n-D). With processes
+            other than 1, f must be defined at module level.
+        bounds: (low, high) for 1-D, or a list of (low, high) for each dimension.
+        n: Grid points per dimension for the coarse scan.
+        kind: "min", "max" or "both".
+        starts: Largest number of local searches for each kind, best seeds first.
+        vectorized: False if f only takes one point at a time.
+        processes: Worker processes for the local searches. 1 (default)
+            runs them here; None uses the CPU count.
+        max_evaluations: Optional budget of function evaluations.
+        max_time: Optional budget of seconds. Searches not started in time
+            are skipped.
+        tolerance: Points closer than this are the same extremum. Default is
+            1e-4 of the largest range.
+        cache: CachedFunction of f to reuse evaluations from earlier calls.
+
+    Returns:
+        minima, maxima: Record arrays with fields x and fun, best first, so
+            minima[0] is the global minimum. Empty for a kind not searched.
+
+    """
+    started = time.perf_counter()
+    one_d = np.ndim(bounds) == 1
+    bounds = [tuple(bounds)] if one_d else [tuple(b) for b in bounds]
+    cache = cache or CachedFunction(f)
+    spans = [high - low for low, high in bounds]
+    # L-BFGS-B with its default tolerances only gets x to about 1e-5 of the
+    # range, so one extremum found from several seeds lands a little apart.
+    tolerance = tolerance or 1e-4 * max(spans)
+
+    # Coarse scan.
+    axes = [np.linspace(low, high, n) for low, high in bounds]
+    grid = np.stack(np.meshgrid(*axes, indexing="ij"))
+    points = grid.reshape(len(bounds), -1).T
+    if vectorized:
+        values = np.asarray(f(grid[0] if one_d else grid), dtype=float)
+    else:
+        values = np.array([cache(p[0] if one_d else p) for p in points]).reshape(grid.shape[1:])
+    evaluations = values.size if vectorized else 0
+    flat = values.ravel()
+
+    signs = {"min": [1], "max": [-1], "both": [1, -1]}[kind]
+    seeds = {}
+    for sign in signs:
+        found = _grid_extrema(values, sign)
+        seeds[sign] = found[np.argsort(sign * flat[found], kind="stable")][:starts]
+    # Alternate the kinds so a budget cut doesn't starve one of them.
+    tasks = [task for pair in itertools.zip_longest(
+        *[[(sign, seed) for seed in seeds[sign]] for sign in signs]) for task in pair if task]
+
+    budget = max_evaluations if max_evaluations is not None else np.inf
+    per_search = 15000
+    if np.isfinite(budget):
+        per_search = int(min(budget/max(len(tasks), 1), per_search))
+    results = {sign: ([], []) for sign in (1, -1)}
+
+    def out_of_budget():
+        over_time = max_time is not None and time.perf_counter() - started > max_time
+        return over_time or evaluations + cache.evaluations >= budget
+
+    def collect(sign, result):
+        x, fun, entries, count = result
+        if entries is not cache.cache:
+            cache.cache.update(entries)
+        results[sign][0].append(x)
+        results[sign][1].append(fun)
+        return count
+
+    if processes == 1:
+        for sign, seed in tasks:
+            if out_of_budget():
+                break
+            collect(sign, _local(cache, points[seed], bounds, sign, per_search))
+    else:
+        with futures.ProcessPoolExecutor(processes or os.cpu_count()) as pool:
+            running = {}
+            for sign, seed in tasks:
+                if out_of_budget():
+                    break
+                worker_cache = CachedFunction(f)
+                running[pool.submit(_local, worker_cache, points[seed], bounds, sign,
+                                    per_search)] = sign
+            for future in futures.as_completed(running):
+                if not future.cancelled():
+                    cache.evaluations += collect(running[future], future.result())
+                if out_of_budget():
+                    for other in running:
+                        other.cancel()  # Searches already running still finish.
+
+    dtype = [("x", float) if one_d else ("x", float, (len(bounds),)), ("fun", float)]
+    found = {}
+    for sign in (1, -1):
+        x, fun = results[sign]
+        if sign in signs and not x and seeds[sign].size:
+            # The budget ran out before any search: fall back on the grid.
+            x, fun = [points[seeds[sign][0]]], [flat[seeds[sign][0]]]
+        x = np.array(x, dtype=float).reshape(-1, len(bounds))
+        fun = np.array(fun, dtype=float)
+        kept = _distinct(x, fun, tolerance, sign)
+        records = np.zeros(len(kept), dtype=dtype)
+        records["x"] = x[kept, 0] if one_d else x[kept]
+        records["fun"] = fun[kept]
+        found[sign] = records.view(np.recarray)
+    return found[1], found[-1]
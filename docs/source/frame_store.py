@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Frame store module.
+
+Saves and loads cached DataFrames for excel_cache.py and soda_client.py.
+Frames are saved as uncompressed Feather files, which load quickly with
+memory mapping, or as pickles when pyarrow is not installed or Feather
+can't store the frame (it only round-trips string column names and a
+default index).
+
+Each file is written under a temporary name and then renamed into place,
+so a write that fails part way never leaves a partial cache file behind.
+
+    >>> import frame_store
+    >>> path = frame_store.save(df, "cache/sheet")  # cache/sheet.feather
+    >>> df = frame_store.load(path)
+
+"""
+
+import os
+
+import pandas as pd
+
+
+def _write(write, path):
+    """Calls write(temporary path), then renames the file to path."""
+    temporary = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        write(temporary)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def save(df, stem):
+    """Saves a DataFrame as stem.feather if possible, otherwise as stem.pkl.
+
+    Returns:
+        path: The file written.
+
+    """
+    simple = (all(isinstance(column, str) for column in df.columns)
+              and isinstance(df.index, pd.RangeIndex) and df.index.start == 0
+              and df.index.step == 1)
+    if simple:
+        try:
+            # Uncompressed so the file can be memory mapped on load.
+            _write(lambda path: df.to_feather(path, compression="uncompressed"),
+                   stem + ".feather")
+            return stem + ".feather"
+        except (ImportError, ValueError, TypeError):
+            pass
+    _write(lambda path: df.to_pickle(path, compression=None), stem + ".pkl")
+    return stem + ".pkl"
+
+
+def load(path):
+    """Loads a DataFrame saved with save()."""
+    if path.endswith(".feather"):
+        from pyarrow import feather
+
+        return feather.read_feather(path, memory_map=True)
+    return pd.read_pickle(path)
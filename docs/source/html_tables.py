@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""HTML tables module.
+
+Reads tables from web pages like ``pd.read_html``, but only parses the
+tables that are asked for. ``pd.read_html(url)`` downloads the page and
+parses every table on it, even when only ``tables[0]`` and ``tables[1]``
+are used. Here:
+
+- the raw page is cached on disk and revalidated with its ETag or
+  Last-Modified header once it is older than max_age;
+- the page is scanned once (a fast regular expression over the tags) for
+  where each table starts and ends, and only the selected tables are
+  parsed, with lxml when it is installed or the standard library parser
+  when it isn't;
+- parsed DataFrames are kept in memory, so refreshing a dashboard does not
+  parse the page again until it changes.
+
+    >>> import html_tables
+    >>> url = r'https://en.wikipedia.org/wiki/List_of_mountains_by_elevation'
+    >>> df1, df2 = html_tables.read_html(url, tables=[0, 1])
+
+"""
+
+from html.parser import HTMLParser
+import hashlib
+import io
+import json
+import os
+import re
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+default_cache_dir = os.environ.get(
+    "HTML_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "html_tables"))
+_table_tags = re.compile(r"<!--.*?-->|<(/?)table\b[^>]*>", re.IGNORECASE | re.DOTALL)
+_tags = re.compile(r"<[^>]*>")
+_memory = {}
+
+
+def _fetch(url, cache_dir, max_age):
+    """Returns (path of the cached page, version, charset), downloading it if needed."""
+    if os.path.exists(url):
+        stat = os.stat(url)
+        return url, "{}-{}".format(stat.st_mtime_ns, stat.st_size), "utf-8"
+
+    stem = os.path.join(cache_dir, hashlib.sha1(url.encode()).hexdigest()[:20])
+    meta = {}
+    if os.path.exists(stem + ".json"):
+        with open(stem + ".json") as file:
+            meta = json.load(file)
+    if meta and time.time() - meta["fetched"] < max_age:
+        return stem + ".html", meta["version"], meta["charset"]
+
+    headers = {"User-Agent": "Mozilla/5.0"}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response:
+            body = response.read()
+            meta = {"etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "charset": response.headers.get_content_charset() or "utf-8",
+                    "version": hashlib.sha1(body).hexdigest()[:16]}
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(stem + ".html", "wb") as file:
+            file.write(body)
+    except urllib.error.HTTPError as error:
+        if error.code != 304 or "version" not in meta:
+            raise
+    meta["fetched"] = time.time()
+    with open(stem + ".json", "w") as file:
+        json.dump(meta, file)
+    return stem + ".html", meta["version"], meta["charset"]
+
+
+def table_spans(text):
+    """Returns (start, end) of every <table> element in document order, like
+    pd.read_html numbers them (nested tables included)."""
+    spans = []
+    open_tables = []
+    for match in _table_tags.finditer(text):
+        if match.group(0).startswith("<!--"):
+            continue
+        if match.group(1):
+            if open_tables:
+                spans[open_tables.pop()][1] = match.end()
+        else:
+            open_tables.append(len(spans))
+            spans.append([match.start(), len(text)])
+    return [tuple(span) for span in spans]
+
+
+class _TableParser(HTMLParser):
+    """Collects the rows and cells of one table (inner tables become text)."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []  # (in thead, [(text, colspan, rowspan, is th)])
+        self._depth = 0
+        self._thead = False
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self._depth += 1
+        if self._depth != 1:
+            return
+        if tag == "thead":
+            self._thead = True
+        elif tag in ("tbody", "tfoot"):
+            self._thead = False
+        elif tag == "tr":
+            self.rows.append((self._thead, []))
+        elif tag in ("td", "th") and self.rows:
+            attrs = dict(attrs)
+            span = [int(re.sub(r"\D", "", attrs.get(name) or "") or 1) for name in ("colspan", "rowspan")]
+            self._cell = [[], span[0], span[1], tag == "th"]
+            self.rows[-1][1].append(self._cell)
+        elif tag == "br" and self._cell:
+            self._cell[0].append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "table":
+            self._depth -= 1
+        elif self._depth == 1 and tag in ("td", "th", "tr"):
+            self._cell = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell[0].append(data)
+
+
+def _grid(rows):
+    """Expands colspan and rowspan into a rectangular list of rows."""
+    grid = []
+    pending = {}  # column -> [rows left, text]
+    for cells in rows:
+        row = []
+        cells = iter(cells)
+        column = 0
+        while True:
+            if column in pending:
+                left, text = pending[column]
+                row.append(text)
+                if left == 1:
+                    del pending[column]
+                else:
+                    pending[column][0] -= 1
+                column += 1
+                continue
+            cell = next(cells, None)
+            if cell is None:
+                if any(key >= column for key in pending):
+                    row.append("")
+                    column += 1
+                    continue
+                break
+            text = " ".join("".join(cell[0]).split())
+            for _ in range(cell[1]):
+                if cell[2] > 1:
+                    pending[column] = [cell[2] - 1, text]
+                row.append(text)
+                column += 1
+        grid.append(row)
+    return grid
+
+
+def _to_frame(fragment, thousands=","):
+    """Parses one table with the standard library parser."""
+    parser = _TableParser()
+    parser.feed(fragment)
+    parser.close()
+    rows = [row for row in parser.rows if row[1]]
+    grid = _grid([row[1] for row in rows])
+
+    # Header rows are the <thead> rows, or else the leading rows of all <th>.
+    header = 0
+    if any(row[0] for row in rows):
+        header = sum(1 for row in rows if row[0])
+    else:
+        while header < len(rows) - 1 and all(cell[3] for cell in rows[header][1]):
+            header += 1
+    width = max((len(row) for row in grid), default=0)
+    grid = [row + [""] * (width - len(row)) for row in grid]
+
+    body = pd.DataFrame(grid[header:], dtype=object).replace("", np.nan)
+    if header == 1:
+        body.columns = grid[0]
+    elif header > 1:
+        body.columns = pd.MultiIndex.from_arrays(grid[:header])
+    for column in range(body.shape[1]):
+        values = body.iloc[:, column]
+        try:
+            numbers = values.str.replace(thousands, "", regex=False) if thousands else values
+            body.isetitem(column, pd.to_numeric(numbers))
+        except (ValueError, TypeError, AttributeError):
+            pass
+    return body
+
+
+def _parse(fragment, **kwargs):
+    """Parses one table fragment, with lxml when it is installed."""
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return _to_frame(fragment, kwargs.get("thousands", ","))
+    return pd.read_html(io.StringIO(fragment), flavor="lxml", **kwargs)[0]
+
+
+def read_html(url, tables=0, match=None, cache_dir=None, max_age=3600, **kwargs):
+    """Reads selected tables from a web page (or local HTML file) through the cache.
+
+    Args:
+        url: Page URL or local file.
+        tables: Index or list of indexes of the tables wanted, counted like
+            pd.read_html(url, match=match).
+        match: Optional regular expression; only tables whose text matches
+            are counted, like pd.read_html.
+        cache_dir: Folder for cached pages. Default is HTML_CACHE_DIR or
+            ~/.cache/html_tables.
+        max_age: Seconds before a cached page is revalidated with the server.
+        **kwargs: Passed to pd.read_html when lxml is installed (the
+            standard library parser only understands thousands).
+
+    Returns:
+        dfs: List of DataFrames, one per requested index. They share data
+            with the memoised copies, so don't edit values in place.
+
+    """
+    path, version, charset = _fetch(url, cache_dir or default_cache_dir, max_age)
+    indexes = [tables] if np.isscalar(tables) else list(tables)
+    options = repr(sorted(kwargs.items()))
+
+    page = _memory.setdefault((url, version), {})
+    if "spans" not in page:
+        for old in [key for key in _memory if key[0] == url and key[1] != version]:
+            del _memory[old]
+        with open(path, "rb") as file:
+            page["text"] = file.read().decode(charset, errors="replace")
+        page["spans"] = table_spans(page["text"])
+        page["matched"] = {}
+
+    # Only test the text of as many tables as needed to reach the largest index.
+    if match is None:
+        matched = range(len(page["spans"]))
+    else:
+        matched, checked = page["matched"].setdefault(match, [[], 0])
+        pattern = re.compile(match)
+        while len(matched) <= max(indexes) and checked < len(page["spans"]):
+            start, end = page["spans"][checked]
+            if pattern.search(_tags.sub(" ", page["text"][start:end])):
+                matched.append(checked)
+            checked += 1
+        page["matched"][match][1] = checked
+    if max(indexes) >= len(matched):
+        raise ValueError("The page has only {} matching tables".format(len(matched)))
+
+    dfs = []
+    for index in indexes:
+        key = (matched[index], options)
+        if key not in page:
+            start, end = page["spans"][matched[index]]
+            page[key] = _parse(page["text"][start:end], **kwargs)
+        dfs.append(page[key].copy(deep=False))
+    return dfs
+
+
+def clear_cache(cache_dir=None):
+    """Deletes all cached pages, on disk and in memory."""
+    _memory.clear()
+    cache_dir = cache_dir or default_cache_dir
+    if os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            os.remove(os.path.join(cache_dir, name))
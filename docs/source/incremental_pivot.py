@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""Incremental pivot module.
+
+Keeps the Engineer x CategoryID pivot table and the value_counts summaries
+of data_analysis.py up to date as project records are added or removed,
+without recomputing over the full history. The aggregate stores a count,
+non-missing count and sum for each (index, columns) pair, so each batch
+costs time proportional to the batch, and the state can be saved to JSON so
+a nightly job only has to read the new records.
+
+    >>> import incremental_pivot
+    >>> projects = incremental_pivot.PivotAggregate.from_frame(
+    ...     df, "Engineer", "CategoryID", values="ActualDays")
+    >>> projects.append(new_projects, watermark=new_projects["ProjectID"].max())
+    >>> projects.pivot()                   # Same as the "dummy" pivot_table.
+    >>> projects.value_counts("Engineer")  # Same as df["Engineer"].value_counts().
+    >>> projects.save("project_pivot.json")
+
+"""
+
+import datetime
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def _label(value):
+    """Returns a plain Python label (numpy scalars don't go into JSON).
+
+    Missing labels become None and numpy dates pandas Timestamps.
+    """
+    if value is None or (np.ndim(value) == 0 and pd.isna(value)):
+        return None
+    if isinstance(value, np.datetime64):
+        return pd.Timestamp(value)
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _encode(value):
+    """Writes dates (and pandas Timestamps) to JSON as ISO 8601 strings."""
+    if isinstance(value, pd.Timestamp):
+        return {"timestamp": value.isoformat()}
+    if isinstance(value, datetime.date):
+        kind = "datetime" if isinstance(value, datetime.datetime) else "date"
+        return {kind: value.isoformat()}
+    raise TypeError("Object of type {} is not JSON serializable".format(type(value).__name__))
+
+
+def _decode(obj):
+    """Reads back the dates written by _encode."""
+    if len(obj) == 1:
+        if "timestamp" in obj:
+            return pd.Timestamp(obj["timestamp"])
+        if "datetime" in obj:
+            return datetime.datetime.fromisoformat(obj["datetime"])
+        if "date" in obj:
+            return datetime.date.fromisoformat(obj["date"])
+    return obj
+
+
+class PivotAggregate:
+    """Running counts and sums of a value for each index x columns pair.
+
+    Args:
+        index: Column for the pivot rows, e.g. "Engineer".
+        columns: Column for the pivot columns, e.g. "CategoryID".
+        values: Optional numeric column to count and sum, e.g. "ActualDays".
+
+    """
+
+    def __init__(self, index, columns, values=None):
+        self.index = index
+        self.columns = columns
+        self.values = values
+        self.watermark = None
+        self.cells = {}  # (index label, columns label) -> [rows, count, sum]
+
+    @classmethod
+    def from_frame(cls, df, index, columns, values=None):
+        """Returns an aggregate seeded with all the rows of a DataFrame."""
+        aggregate = cls(index, columns, values)
+        aggregate.append(df)
+        return aggregate
+
+    def _batch(self, batch):
+        """Returns the rows, non-missing count and sum of each cell of a batch."""
+        keys = [self.index, self.columns]
+        # Rows with a missing label are kept, so value_counts of the other
+        # column still counts them; pivot leaves them out like pivot_table.
+        if self.values is None:
+            groups = batch.groupby(keys, sort=False, dropna=False)
+            sizes = groups.size()
+            return zip(sizes.index, sizes.to_numpy(), sizes.to_numpy(), np.zeros(len(sizes)))
+        groups = batch.groupby(keys, sort=False, dropna=False)[self.values]
+        table = groups.agg(["size", "count", "sum"])
+        return zip(table.index, table["size"].to_numpy(), table["count"].to_numpy(),
+                   table["sum"].to_numpy(dtype=float))
+
+    def _update(self, batch, sign):
+        for key, rows, count, total in self._batch(batch):
+            key = (_label(key[0]), _label(key[1]))
+            cell = self.cells.setdefault(key, [0, 0, 0.0])
+            cell[0] += sign * int(rows)
+            cell[1] += sign * int(count)
+            cell[2] += sign * float(total)
+            if cell[0] <= 0:
+                del self.cells[key]
+
+    def append(self, batch, watermark=None):
+        """Adds a batch of new records.
+
+        Args:
+            batch: DataFrame with the index, columns and values columns.
+            watermark: Optional marker of the last record processed (e.g.
+                the largest ProjectID or a date), saved with the state.
+
+        """
+        self._update(batch, 1)
+        if watermark is not None:
+            self.watermark = _label(watermark)
+
+    def retract(self, batch):
+        """Removes a batch of records that were added before."""
+        self._update(batch, -1)
+
+    def pivot(self, aggfunc="size", fill_value=0):
+        """Returns the pivot table.
+
+        Args:
+            aggfunc: "size" (rows, the "dummy" column count), "count"
+                (non-missing values), "sum" or "mean".
+            fill_value: Value for pairs with no records.
+
+        Returns:
+            table: DataFrame like df.pivot_table(..., aggfunc=aggfunc).
+
+        """
+        field = {"size": 0, "count": 1, "sum": 2, "mean": 2}[aggfunc]
+        labelled = {key: cell for key, cell in self.cells.items() if None not in key}
+        if not labelled:
+            return pd.DataFrame()
+        keys = pd.MultiIndex.from_tuples(list(labelled), names=[self.index, self.columns])
+        cells = np.array(list(labelled.values()), dtype=float)
+        result = cells[:, field]
+        if aggfunc == "mean":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result = result/cells[:, 1]
+        if aggfunc in ("size", "count"):
+            result = result.astype(np.int64)
+        table = pd.Series(result, index=keys).unstack(fill_value=fill_value)
+        return table.sort_index().sort_index(axis=1)
+
+    def value_counts(self, column=None):
+        """Returns the number of records per label, largest first.
+
+        Args:
+            column: The index or columns column. Default is the index.
+
+        """
+        level = 1 if column == self.columns else 0
+        counts = {}
+        for key, cell in self.cells.items():
+            if key[level] is None:
+                continue
+            counts[key[level]] = counts.get(key[level], 0) + cell[0]
+        counts = pd.Series(counts, dtype="int64", name="count")
+        counts.index.name = self.columns if level else self.index
+        return counts.sort_values(ascending=False, kind="stable")
+
+    def state(self):
+        """Returns the state as a JSON-compatible dictionary."""
+        return {"index": self.index, "columns": self.columns, "values": self.values,
+                "watermark": self.watermark,
+                "cells": [list(key) + cell for key, cell in self.cells.items()]}
+
+    @classmethod
+    def from_state(cls, state):
+        """Returns an aggregate rebuilt from state()."""
+        aggregate = cls(state["index"], state["columns"], state["values"])
+        aggregate.watermark = state["watermark"]
+        aggregate.cells = {(row, column): [rows, count, total]
+                           for row, column, rows, count, total in state["cells"]}
+        return aggregate
+
+    def save(self, path):
+        """Saves the state to a JSON file.
+
+        The state is written to a temporary file that then replaces path, so
+        a failed save leaves the previous file as it was.
+        """
+        temporary = os.fspath(path) + ".tmp"
+        try:
+            with open(temporary, "w") as file:
+                json.dump(self.state(), file, default=_encode)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    @classmethod
+    def load(cls, path):
+        """Loads an aggregate saved with save()."""
+        with open(path) as file:
+            return cls.from_state(json.load(file, object_hook=_decode))
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""Linear systems module.
+
+Solves many small systems of equations at once, like the stiffness systems
+of every design in a sweep. matrix_analysis.rst solves one system at a
+time, first with ``np.dot(np.linalg.inv(A), b)`` and then with
+``np.linalg.solve(A, b)``. For thousands of systems a Python loop spends
+most of its time on call overhead, so here the matrices are stacked into
+one array of shape (N, n, n) and handled in single calls:
+
+- solve: one ``np.linalg.solve`` call for the whole stack (never an
+  explicit inverse, which is slower and less accurate);
+- assemble: adds element matrices into stacked global matrices;
+- lu_factor and lu_solve: LU factors of a stack, to solve the same
+  matrices again for new load vectors without factoring again;
+- LUCache: keeps the factors of matrices already seen.
+
+Other matrix operations already work on stacks: ``A @ B`` multiplies each
+pair of matrices and ``np.swapaxes(A, -1, -2)`` transposes each matrix.
+
+    >>> import linear_systems
+    >>> A = np.array([2, -1, 5, 1, 3, 2, 2, -6, 1, 3, 3, -1, 5, -2, -3, 3]).reshape(4, 4)
+    >>> b = np.array([-3, -32, -47, 49])
+    >>> linear_systems.solve(np.stack([A, 2 * A]), np.stack([b, b]))
+    array([[  2. , -12. ,  -4. ,   1. ],
+           [  1. ,  -6. ,  -2. ,   0.5]])
+
+"""
+
+import collections
+import hashlib
+
+import numpy as np
+
+
+def _as_columns(A, b):
+    """Returns b with a column axis, and whether it was a vector per system."""
+    b = np.asarray(b, dtype=float)
+    vector = b.ndim == A.ndim - 1
+    return (b[..., np.newaxis] if vector else b), vector
+
+
+def solve(A, b, singular="raise"):
+    """Solves A x = b for a stack of systems in one call.
+
+    Args:
+        A: Matrices, shape (n, n) or (N, n, n).
+        b: Right-hand sides, shape (n,) or (N, n) for one vector per
+            system, or (n, k) or (N, n, k) for k load cases per system.
+        singular: "raise" to raise numpy.linalg.LinAlgError if any matrix is
+            singular, or "nan" to return NaN for those systems only.
+
+    Returns:
+        x: Same shape as b.
+
+    """
+    A = np.asarray(A, dtype=float)
+    b, vector = _as_columns(A, b)
+    try:
+        x = np.linalg.solve(A, b)
+    except np.linalg.LinAlgError:
+        if singular != "nan" or A.ndim < 3:
+            raise
+        # Solve the nonsingular systems; LU pivots of 0 mark the others.
+        factors = lu_factor(A)[0]
+        ok = np.all(np.diagonal(factors, axis1=-2, axis2=-1) != 0, axis=-1)
+        x = np.full(np.broadcast_shapes(A.shape[:-2], b.shape[:-2]) + b.shape[-2:], np.nan)
+        b = np.broadcast_to(b, x.shape)
+        x[ok] = np.linalg.solve(A[ok], b[ok])
+    return x[..., 0] if vector else x
+
+
+def assemble(elements, dofs, size):
+    """Adds element matrices into stacked global matrices.
+
+    Every system has the same connectivity (e.g. the same truss with
+    different member sizes), so each element is added to all the systems
+    in one step.
+
+    Args:
+        elements: Element matrices, shape (N, elements, m, m).
+        dofs: Global degree of freedom of each element row, shape (elements, m).
+        size: Number of global degrees of freedom n.
+
+    Returns:
+        K: Global matrices, shape (N, n, n).
+
+    """
+    elements = np.asarray(elements, dtype=float)
+    dofs = np.asarray(dofs, dtype=np.intp)
+    K = np.zeros((elements.shape[0], size, size))
+    for e, d in enumerate(dofs):
+        K[:, d[:, np.newaxis], d[np.newaxis, :]] += elements[:, e]
+    return K
+
+
+def lu_factor(A):
+    """Calculates LU factors with partial pivoting for a stack of matrices.
+
+    Works like scipy.linalg.lu_factor on each matrix (same output format),
+    but loops over the n columns instead of the N matrices, so it is fast
+    for many small matrices. Singular matrices get a zero on the diagonal.
+
+    Args:
+        A: Matrices, shape (n, n) or (N, n, n).
+
+    Returns:
+        factors: L (below the diagonal, unit diagonal implied) and U,
+            same shape as A.
+        pivots: Row swapped with row i at step i, shape (n,) or (N, n).
+
+    """
+    A = np.asarray(A, dtype=float)
+    n = A.shape[-1]
+    # Stack axis last, so every step works on contiguous rows of N numbers.
+    factors = np.moveaxis(A.reshape(-1, n, n), 0, -1).copy()
+    stack = np.arange(factors.shape[-1])
+    pivots = np.empty((n, len(stack)), dtype=np.intp)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for k in range(n):
+            p = k + np.argmax(np.abs(factors[k:, k]), axis=0)
+            pivots[k] = p
+            row = factors[k].copy()
+            factors[k] = factors[p, :, stack].T
+            factors[p, :, stack] = row.T
+            pivot = factors[k, k]
+            factors[k + 1:, k] = np.where(pivot != 0, factors[k + 1:, k]/pivot, 0)
+            factors[k + 1:, k + 1:] -= factors[k + 1:, k, np.newaxis] * factors[k, k + 1:]
+    return (np.moveaxis(factors, -1, 0).reshape(A.shape),
+            np.moveaxis(pivots, -1, 0).reshape(A.shape[:-1]))
+
+
+def _prepare(lu):
+    """Returns the factors with the stack axis last and the row permutation.
+
+    With the stack axis last, every step of the substitutions works on
+    contiguous rows of N numbers.
+    """
+    factors, pivots = lu
+    n = factors.shape[-1]
+    factors = factors.reshape(-1, n, n)
+    pivots = pivots.reshape(-1, n)
+    rows = np.arange(len(pivots))
+    permutation = np.tile(np.arange(n), (len(pivots), 1))
+    for k in range(n):
+        swapped = permutation[rows, pivots[:, k]]
+        permutation[rows, pivots[:, k]] = permutation[:, k]
+        permutation[:, k] = swapped
+    return np.ascontiguousarray(np.moveaxis(factors, 0, -1)), permutation
+
+
+def _substitute(prepared, b):
+    """Solves with prepared factors for b of shape (N, n, k)."""
+    factors, permutation = prepared
+    n = factors.shape[0]
+    x = np.take_along_axis(b, permutation[:, :, np.newaxis], axis=1)
+    x = np.ascontiguousarray(np.moveaxis(x, 0, -1))  # (n, k, N)
+    for k in range(n - 1):
+        x[k + 1:] -= factors[k + 1:, k, np.newaxis] * x[k]
+    for k in range(n - 1, -1, -1):
+        x[k] /= factors[k, k]
+        x[:k] -= factors[:k, k, np.newaxis] * x[k]
+    return np.moveaxis(x, -1, 0)
+
+
+def lu_solve(lu, b, prepared=None):
+    """Solves A x = b with the factors from lu_factor.
+
+    Args:
+        lu: (factors, pivots) from lu_factor.
+        b: Right-hand sides, shape (n,) or (N, n), or (n, k) or (N, n, k)
+            for k load cases per system.
+        prepared: Internal rearrangement of lu (see LUCache).
+
+    Returns:
+        x: Same shape as b.
+
+    """
+    factors = lu[0]
+    prepared = prepared or _prepare(lu)
+    b, vector = _as_columns(factors, b)
+    if factors.ndim == 2:
+        # One matrix: every right-hand side becomes a column.
+        columns = np.moveaxis(b, -2, 0).reshape(len(factors), -1)
+        x = _substitute(prepared, columns[np.newaxis])[0]
+        x = np.moveaxis(x.reshape((len(factors),) + b.shape[:-2] + b.shape[-1:]), 0, -2)
+    else:
+        b = np.broadcast_to(b, factors.shape[:-2] + b.shape[-2:])
+        n, k = b.shape[-2:]
+        x = _substitute(prepared, b.reshape(-1, n, k)).reshape(b.shape)
+    return x[..., 0] if vector else x
+
+
+class LUCache:
+    """Keeps the LU factors of matrices that are solved again with new loads.
+
+    Matrices (or stacks of matrices) are recognised by their contents, so
+    solving the same stiffness matrices for another load case skips the
+    factorisation.
+
+    Args:
+        maxsize: Largest number of matrices or stacks kept; the least
+            recently used are dropped first.
+
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.factors = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def factor(self, A):
+        """Returns the LU factors of A, computing them only the first time."""
+        return self._lookup(A)[0]
+
+    def _lookup(self, A):
+        """Returns (factors, prepared factors) of A from the cache or new."""
+        A = np.ascontiguousarray(A, dtype=float)
+        key = (A.shape, hashlib.sha1(A).digest())
+        if key in self.factors:
+            self.hits += 1
+            self.factors.move_to_end(key)
+        else:
+            self.misses += 1
+            lu = lu_factor(A)
+            self.factors[key] = (lu, _prepare(lu))
+            if len(self.factors) > self.maxsize:
+                self.factors.popitem(last=False)
+        return self.factors[key]
+
+    def solve(self, A, b):
+        """Solves A x = b, reusing the factors of A if it was seen before."""
+        lu, prepared = self._lookup(A)
+        return lu_solve(lu, b, prepared)
+
+    def clear(self):
+        """Drops all the factors."""
+        self.factors.clear()
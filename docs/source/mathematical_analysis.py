@@ -11,10 +11,10 @@ import numpy as np
 import pandas as pd
 
 from civil import water
+import derivative
 
 from scipy import optimize
 from scipy import integrate
-from scipy import misc
 
 
 
@@ -83,6 +83,6 @@ def f2(x):
 
 result = optimize.minimize(f, -1.5)
 min_location = result.x[0]
-slope = misc.derivative(f, min_location, dx=0.0000001)
+slope = derivative.derivative(f, min_location)
 print(slope)
 
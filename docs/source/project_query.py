@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""Project query module.
+
+Provides indexed filtering and count pivots for large project tables such
+as Company_Project_Data.xlsx. Instead of scanning the whole DataFrame for
+every ``df.query(...)`` call, an IndexedFrame builds indexes once:
+
+- low-cardinality columns (e.g. Engineer, CategoryID) get a bitmap per
+  value, stored bit-packed (one bit per row) and built on first use;
+  high-cardinality text columns keep only their integer codes;
+- other numeric columns (e.g. EstimatedDays, EstimatedCost) get a sorted
+  index searched with binary search.
+
+Chained predicates are collected first and evaluated together: predicates
+on the same column are merged into one range, each predicate becomes a
+packed bitmap, and the bitmaps are combined with a single AND pass before
+any rows are selected. Count pivots come straight from the integer codes of
+the categorical indexes with ``np.bincount``, so the ``dummy`` column is no
+longer needed.
+
+    >>> import project_query
+    >>> projects = project_query.IndexedFrame(df, ["CategoryID", "Engineer",
+    ...                                            "EstimatedDays", "EstimatedCost"])
+    >>> d = projects.query("CategoryID == 5 and EstimatedDays > 20 and EstimatedCost > 500000")
+    >>> d.frame().shape
+    >>> projects.pivot_count("Engineer", "CategoryID")
+
+"""
+
+import ast
+import re
+
+import numpy as np
+import pandas as pd
+
+_predicate = re.compile(r"^\s*(\w+)\s*(==|!=|<=|>=|<|>|in)\s*(.+?)\s*$")
+
+
+class _BitmapIndex:
+    """Integer codes of a column, with packed bitmaps for its values.
+
+    A value's bitmap is built the first time a predicate needs it, and only
+    when the column has at most bitmap_limit distinct values; otherwise (or
+    when a predicate matches many values) rows are selected from the codes
+    with a lookup table, so memory stays O(rows).
+    """
+
+    def __init__(self, values, bitmap_limit=256):
+        self.codes, self.uniques = pd.factorize(values, sort=True)
+        self.size = len(values)
+        self.use_bitmaps = len(self.uniques) <= bitmap_limit
+        self.bitmaps = {}
+
+    def _bitmap_of(self, code):
+        """Returns the packed bitmap of one code (-1 for missing values)."""
+        if code not in self.bitmaps:
+            self.bitmaps[code] = np.packbits(self.codes == code)
+        return self.bitmaps[code]
+
+    def _codes_for(self, op, value):
+        """Returns the codes whose value satisfies the comparison."""
+        uniques = np.asarray(self.uniques)
+        if op == "in":
+            return np.flatnonzero(np.isin(uniques, list(value)))
+        compare = {"==": np.equal, "!=": np.not_equal, "<": np.less,
+                   "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal}[op]
+        return np.flatnonzero(compare(uniques, value))
+
+    def bitmap(self, predicates):
+        """Returns the packed bitmap of rows matching all predicates."""
+        codes = None
+        for op, value in predicates:
+            matched = self._codes_for(op, value)
+            codes = matched if codes is None else np.intersect1d(codes, matched)
+        if all(op == "!=" for op, value in predicates):
+            codes = np.append(codes, -1)  # NaN != value is True, as in pandas.
+
+        if self.use_bitmaps and len(codes) <= 8:
+            result = np.zeros((self.size + 7)//8, dtype=np.uint8)
+            for code in codes:
+                result |= self._bitmap_of(code)
+            return result
+        selected = np.zeros(len(self.uniques) + 1, dtype=bool)  # Last entry is code -1.
+        selected[codes] = True
+        return np.packbits(selected[self.codes])
+
+
+class _SortedIndex:
+    """Row order that sorts a numeric column, for range searches."""
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=float)
+        self.order = np.argsort(values, kind="stable")
+        self.sorted = values[self.order]
+        self.size = len(values)
+        self.missing = np.searchsorted(self.sorted, np.nan)  # NaN sorts last.
+
+    def bitmap(self, predicates):
+        """Returns the packed bitmap of rows matching all predicates.
+
+        All range predicates on the column are merged into one slice of the
+        sorted order; != and in are applied to that slice.
+        """
+        low, high = 0, self.missing
+        excluded = []
+        allowed = None
+        for op, value in predicates:
+            if op in ("==", ">="):
+                low = max(low, np.searchsorted(self.sorted, value, "left"))
+            if op in ("==", "<="):
+                high = min(high, np.searchsorted(self.sorted, value, "right"))
+            if op == ">":
+                low = max(low, np.searchsorted(self.sorted, value, "right"))
+            if op == "<":
+                high = min(high, np.searchsorted(self.sorted, value, "left"))
+            if op == "!=":
+                excluded.append(value)
+            if op == "in":
+                allowed = set(value) if allowed is None else allowed & set(value)
+
+        mask = np.zeros(self.size, dtype=bool)
+        if low < high:
+            rows = self.order[low:high]
+            values = self.sorted[low:high]
+            keep = ~np.isin(values, excluded)
+            if allowed is not None:
+                keep &= np.isin(values, list(allowed))
+            mask[rows[keep]] = True
+        if all(op == "!=" for op, value in predicates):
+            mask[self.order[self.missing:]] = True  # NaN != value is True, as in pandas.
+        return np.packbits(mask)
+
+
+class Query:
+    """A chain of predicates on an IndexedFrame, evaluated together."""
+
+    def __init__(self, frame, predicates=()):
+        self.indexed = frame
+        self.predicates = list(predicates)
+
+    def where(self, column, op, value):
+        """Returns a new Query with one more predicate, e.g. ("EstimatedDays", ">", 20)."""
+        return Query(self.indexed, self.predicates + [(column, op, value)])
+
+    def query(self, expression):
+        """Adds the predicates of a simple "a == 1 and b > 2" expression."""
+        query = self
+        for part in re.split(r"\s+and\s+", expression.strip()):
+            match = _predicate.match(part)
+            if not match:
+                raise ValueError("Unsupported predicate: {}".format(part))
+            column, op, literal = match.groups()
+            query = query.where(column, op, ast.literal_eval(literal))
+        return query
+
+    def mask(self):
+        """Returns a boolean array of the rows matching every predicate."""
+        size = len(self.indexed.df)
+        by_column = {}
+        for column, op, value in self.predicates:
+            by_column.setdefault(column, []).append((op, value))
+
+        packed = np.full((size + 7)//8, 255, dtype=np.uint8)
+        for column, predicates in by_column.items():
+            packed &= self.indexed.index(column).bitmap(predicates)
+        return np.unpackbits(packed, count=size).astype(bool)
+
+    def count(self):
+        """Returns the number of matching rows."""
+        return int(np.count_nonzero(self.mask()))
+
+    def frame(self):
+        """Returns the matching rows as a DataFrame."""
+        return self.indexed.df[self.mask()]
+
+    def pivot_count(self, index, columns):
+        """Returns a count pivot table of the matching rows."""
+        return self.indexed.pivot_count(index, columns, self.mask())
+
+    def value_counts(self, column):
+        """Returns value counts of a column for the matching rows."""
+        return self.indexed.value_counts(column, self.mask())
+
+
+class IndexedFrame:
+    """A DataFrame with indexes kept on its filter columns.
+
+    Args:
+        df: DataFrame. Treat it as read-only while indexed.
+        columns: Columns to index now. Others are indexed on first use.
+        bitmap_limit: Numeric columns with at most this many distinct values
+            get bitmap indexes, the rest sorted indexes. Non-numeric columns
+            always get code indexes, with bitmaps only up to this many
+            distinct values.
+
+    """
+
+    def __init__(self, df, columns=(), bitmap_limit=256):
+        self.df = df
+        self.bitmap_limit = bitmap_limit
+        self.indexes = {}
+        self._factorized = {}  # Codes of columns with sorted indexes (or none).
+        for column in columns:
+            self.index(column)
+
+    def index(self, column):
+        """Returns the index of a column, building it the first time."""
+        if column not in self.indexes:
+            values = self.df[column]
+            numeric = pd.api.types.is_numeric_dtype(values)
+            if not numeric or values.nunique() <= self.bitmap_limit:
+                self.indexes[column] = _BitmapIndex(values, self.bitmap_limit)
+            else:
+                self.indexes[column] = _SortedIndex(values)
+        return self.indexes[column]
+
+    def where(self, column, op, value):
+        """Starts a Query, e.g. projects.where("CategoryID", "==", 5)."""
+        return Query(self).where(column, op, value)
+
+    def query(self, expression):
+        """Starts a Query from a simple "a == 1 and b > 2" expression."""
+        return Query(self).query(expression)
+
+    def _codes(self, column):
+        """Returns integer codes and labels of a column (-1 for missing)."""
+        index = self.indexes.get(column)
+        if isinstance(index, _BitmapIndex):
+            return index.codes, index.uniques
+        if column not in self._factorized:
+            self._factorized[column] = pd.factorize(self.df[column], sort=True)
+        return self._factorized[column]
+
+    def pivot_count(self, index, columns, mask=None):
+        """Returns a count pivot table (rows per index x columns value).
+
+        Same as pivot_table(values="dummy", index=index, columns=columns,
+        aggfunc="count", fill_value=0) with df["dummy"] = 1.
+        """
+        row_codes, row_labels = self._codes(index)
+        column_codes, column_labels = self._codes(columns)
+        valid = (row_codes >= 0) & (column_codes >= 0)  # Skip missing keys.
+        if mask is not None:
+            valid &= mask
+        cells = row_codes[valid] * len(column_labels) + column_codes[valid]
+        counts = np.bincount(cells, minlength=len(row_labels) * len(column_labels))
+        table = pd.DataFrame(counts.reshape(len(row_labels), len(column_labels)),
+                             index=pd.Index(row_labels, name=index),
+                             columns=pd.Index(column_labels, name=columns))
+        # Like pivot_table, drop labels that have no rows.
+        return table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0]
+
+    def value_counts(self, column, mask=None):
+        """Returns counts of each value, largest first, like value_counts()."""
+        codes, labels = self._codes(column)
+        if mask is not None:
+            codes = codes[mask]
+        counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+        result = pd.Series(counts, index=pd.Index(labels, name=column), name="count")
+        return result[result > 0].sort_values(ascending=False, kind="stable")
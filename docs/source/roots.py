@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""Roots module.
+
+Finds every root of a function in an interval, instead of one root per
+hand-picked guess like ``optimize.root(f, [-2, 0.5, 2, 3.0])``, whose
+answers depend on the guesses. The function is evaluated on a fine grid,
+each sign change gives a bracket, and all brackets are narrowed together:
+every iteration evaluates f once on an array of points (one per unfinished
+bracket). Grid points where f is exactly zero are roots too. Roots closer
+than the tolerance are merged.
+
+When f is expensive, the evaluations can be split across worker processes.
+
+    >>> import roots
+    >>> def f(x):
+    ...     return -0.4*x**4 + 3 * x**3 + 0.9 * x**2 - 12 * x + 12
+    >>> roots.find_roots(f, -10, 10)
+    array([-2.231612 ,  7.3243227])
+
+Roots where f touches zero without changing sign (double roots) have no
+sign change to bracket, so they are only found if f is exactly zero at a
+grid point. Sign changes at poles (e.g. tan at pi/2) are not roots and are
+dropped.
+"""
+
+from concurrent import futures
+import functools
+import os
+
+import numpy as np
+
+
+def _apply(f, x):
+    """Evaluates a scalar function at each point of an array."""
+    return np.array([f(value) for value in x], dtype=float)
+
+
+class _Evaluator:
+    """Evaluates f on arrays, in this process or split across a process pool."""
+
+    def __init__(self, f, vectorized, processes):
+        self.f = f if vectorized else functools.partial(_apply, f)
+        self.processes = processes
+        self.pool = None
+        if processes is not None and processes != 1:
+            self.processes = processes or os.cpu_count()
+            self.pool = futures.ProcessPoolExecutor(self.processes)
+
+    def __call__(self, x):
+        if self.pool is None or len(x) < 2 * self.processes:
+            return np.asarray(self.f(x), dtype=float)
+        chunks = np.array_split(x, self.processes)
+        return np.concatenate(list(self.pool.map(self.f, chunks)))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+def refine(f, a, b, fa=None, fb=None, method="illinois", xtol=1e-12, rtol=4e-16,
+           maxiter=200):
+    """Narrows many brackets at once.
+
+    Args:
+        f: Function of an array of points returning an array of values.
+        a, b: Arrays of bracket ends; f(a) and f(b) must have opposite signs.
+        fa, fb: f(a) and f(b) if already known.
+        method: "illinois" (regula falsi with the Illinois modification,
+            superlinear) or "bisect".
+        xtol, rtol: A bracket is done when its width is below
+            xtol + rtol * abs(root).
+        maxiter: Largest number of iterations.
+
+    Returns:
+        roots: Array of roots, one per bracket.
+
+    """
+    a = np.array(a, dtype=float)
+    b = np.array(b, dtype=float)
+    fa = f(a) if fa is None else np.array(fa, dtype=float)
+    fb = f(b) if fb is None else np.array(fb, dtype=float)
+    roots = np.where(fa == 0, a, b)
+    active = np.flatnonzero((fa != 0) & (fb != 0))
+
+    for _ in range(maxiter):
+        if active.size == 0:
+            break
+        a_, b_, fa_, fb_ = a[active], b[active], fa[active], fb[active]
+        x = (a_ + b_)/2
+        if method == "illinois":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                secant = b_ - fb_ * (b_ - a_)/(fb_ - fa_)
+            inside = (secant - np.minimum(a_, b_)) * (np.maximum(a_, b_) - secant) > 0
+            x = np.where(inside, secant, x)
+        fx = f(x)
+
+        if method == "illinois":
+            # Keep b as the newest point; halve f at an end that is kept twice.
+            swap = fx * fb_ < 0
+            a[active] = np.where(swap, b_, a_)
+            fa[active] = np.where(swap, fb_, fa_/2)
+            b[active] = x
+            fb[active] = fx
+        else:
+            left = np.sign(fx) == np.sign(fa_)
+            a[active] = np.where(left, x, a_)
+            fa[active] = np.where(left, fx, fa_)
+            b[active] = np.where(left, b_, x)
+            fb[active] = np.where(left, fb_, fx)
+
+        roots[active] = x
+        done = (fx == 0) | (np.abs(b[active] - a[active]) <= xtol + rtol * np.abs(x))
+        active = active[~done]
+    return roots
+
+
+def find_roots(f, a, b, n=10000, method="illinois", xtol=1e-12, vectorized=True,
+               processes=1):
+    """Finds all the roots of f between a and b.
+
+    Args:
+        f: Function. With vectorized=True it must take and return arrays
+            (most numpy expressions do). With processes other than 1 it must
+            be defined at module level so it can be sent to worker processes.
+        a, b: Interval to search.
+        n: Number of grid intervals. Roots closer together than (b - a)/n
+            can be missed, so use a grid finer than the features of f.
+        method: "illinois" or "bisect" (see refine).
+        xtol: Absolute tolerance of the roots.
+        vectorized: False if f only takes one number at a time.
+        processes: Worker processes for evaluating f. 1 (default) evaluates
+            in this process; None uses the CPU count.
+
+    Returns:
+        roots: Sorted array of roots.
+
+    """
+    evaluate = _Evaluator(f, vectorized, processes)
+    try:
+        x = np.linspace(a, b, n + 1)
+        y = evaluate(x)
+        sign = np.sign(y)
+        brackets = np.flatnonzero(sign[:-1] * sign[1:] < 0)
+        found = refine(evaluate, x[brackets], x[brackets + 1], y[brackets],
+                       y[brackets + 1], method=method, xtol=xtol)
+        # A sign change can also be a pole (e.g. tan); there |f| grows instead.
+        smallest = np.minimum(np.abs(y[brackets]), np.abs(y[brackets + 1]))
+        found = found[np.abs(evaluate(found)) <= smallest]
+    finally:
+        evaluate.close()
+
+    found = np.sort(np.concatenate([found, x[y == 0]]))
+    if found.size:
+        found = found[np.concatenate([[True], np.diff(found) > 2 * xtol])]
+    return found
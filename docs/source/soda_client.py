@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""SODA client module.
+
+Reads open-data API endpoints, such as the City of Seattle wage data, into
+a DataFrame. Socrata (SODA) endpoints return at most $limit rows per
+request (1000 without an app token), so the data is read page by page
+using $limit, $offset and a stable $order. This module:
+
+- requests several pages at a time with asyncio, through a small pool of
+  keep-alive HTTP connections;
+- limits the request rate (and waits when the server answers 429);
+- keeps each page in a local columnar cache (Feather files) with its ETag
+  and Last-Modified headers, so later runs revalidate pages with
+  conditional requests and unchanged pages are not downloaded again;
+- with since_column, only asks for rows newer than the cached ones.
+
+Only the standard library and pandas are needed. Each blocking request
+runs in a worker thread with asyncio.to_thread. Any HTTP server that
+understands the same query parameters works, including a local stand-in
+server for testing.
+
+    >>> import soda_client
+    >>> url = "https://data.seattle.gov/resource/2khk-5ukd.csv"
+    >>> df = soda_client.read_soda(url, app_token=my_token)
+
+"""
+
+import asyncio
+import hashlib
+import http.client
+import io
+import json
+import os
+import time
+import urllib.parse
+
+import numpy as np
+import pandas as pd
+
+import frame_store
+
+default_cache_dir = os.environ.get(
+    "SODA_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "soda"))
+retry_statuses = (429, 500, 502, 503, 504)
+
+
+class RateLimiter:
+    """Token bucket allowing rate requests per second, in bursts of up to burst."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        """Waits until a request is allowed."""
+        async with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens)/self.rate)
+                self.tokens = 1
+                self.updated = time.monotonic()
+            self.tokens -= 1
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections to one host, used by up to size requests at once."""
+
+    def __init__(self, url, size=4, timeout=60):
+        parts = urllib.parse.urlsplit(url)
+        self.https = parts.scheme == "https"
+        self.host = parts.netloc
+        self.timeout = timeout
+        self._idle = []
+        self._semaphore = asyncio.Semaphore(size)
+
+    def _connect(self):
+        if self.https:
+            return http.client.HTTPSConnection(self.host, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, timeout=self.timeout)
+
+    @staticmethod
+    def _send(connection, path, headers):
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()
+        return response.status, response.headers, response.read()
+
+    async def get(self, path, headers):
+        """Sends a GET request and returns (status, headers, body)."""
+        async with self._semaphore:
+            connection = self._idle.pop() if self._idle else self._connect()
+            try:
+                result = await asyncio.to_thread(self._send, connection, path, headers)
+            except (http.client.HTTPException, OSError):
+                connection.close()  # The server may have closed a kept-alive connection.
+                raise
+            self._idle.append(connection)
+            return result
+
+    def close(self):
+        for connection in self._idle:
+            connection.close()
+        self._idle.clear()
+
+
+def _literal(value):
+    """Returns a SoQL literal for a value."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'{}'".format(str(value).replace("'", "''"))
+
+
+class SodaClient:
+    """Paged, cached reader for one SODA endpoint.
+
+    Args:
+        url: CSV endpoint, e.g. https://data.seattle.gov/resource/2khk-5ukd.csv.
+        cache_dir: Folder for cached pages. Default is SODA_CACHE_DIR or
+            ~/.cache/soda.
+        app_token: Optional app token, sent as X-App-Token.
+        page_size: Rows per request ($limit).
+        concurrency: Requests in flight at once (and pooled connections).
+        rate: Requests per second allowed.
+        retries: Attempts after a failed request, 429 or 5xx response.
+        order: Column giving a stable row order for paging ($order).
+        since_column: Optional column that increases for new or updated rows
+            (e.g. ":updated_at"). When set, later runs only request rows
+            with a larger value than the largest cached one instead of
+            revalidating every page. It must be among the returned columns
+            (system columns like :updated_at need {"$select": ":*, *"});
+            otherwise ValueError is raised.
+        key: Optional column identifying rows. Used with since_column to keep
+            only the latest copy of updated rows.
+        params: Other query parameters, e.g. {"$select": ":*, *"}.
+
+    """
+
+    def __init__(self, url, cache_dir=None, app_token=None, page_size=1000,
+                 concurrency=4, rate=5.0, retries=3, order=":id",
+                 since_column=None, key=None, params=None):
+        self.url = url
+        self.app_token = app_token
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+        self.order = since_column or order
+        self.since_column = since_column
+        self.key = key
+        self.params = dict(params or {})
+
+        name = repr((url, self.order, since_column, sorted(self.params.items())))
+        name = hashlib.sha1(name.encode()).hexdigest()[:20]
+        self.cache_dir = os.path.join(cache_dir or default_cache_dir, name)
+        self._meta_path = os.path.join(self.cache_dir, "meta.json")
+
+    def _path(self, offset, where):
+        """Returns the request path and query for a page."""
+        parts = urllib.parse.urlsplit(self.url)
+        query = urllib.parse.parse_qsl(parts.query)
+        query += list(self.params.items())
+        query += [("$order", self.order), ("$limit", self.page_size), ("$offset", offset)]
+        if where:
+            query.append(("$where", where))
+        return parts.path + "?" + urllib.parse.urlencode(query)
+
+    async def _get(self, path, headers):
+        """Sends a request through the pool, retrying failures with backoff."""
+        for attempt in range(self.retries + 1):
+            await self._limiter.wait()
+            try:
+                status, response_headers, body = await self._pool.get(path, headers)
+            except (http.client.HTTPException, OSError):
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(2**attempt)
+                continue
+            if status not in retry_statuses or attempt == self.retries:
+                break
+            retry_after = response_headers.get("Retry-After", "")
+            await asyncio.sleep(float(retry_after) if retry_after.isdigit() else 2**attempt)
+
+        if status >= 400:
+            raise IOError("GET {} returned HTTP {}: {}".format(path, status, body[:200]))
+        return status, response_headers, body
+
+    async def _page(self, offset, where=None, cached=None):
+        """Fetches (or revalidates) one page and returns its metadata entry."""
+        headers = {"Accept": "text/csv"}
+        if self.app_token:
+            headers["X-App-Token"] = self.app_token
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        status, response_headers, body = await self._get(self._path(offset, where), headers)
+        if status == 304:
+            return cached
+
+        df = pd.read_csv(io.BytesIO(body)) if body.strip() else pd.DataFrame()
+        if self.since_column and len(df.columns) and self.since_column not in df:
+            raise ValueError(
+                "since_column {!r} is not among the returned columns {}; select it, e.g. "
+                "params={{'$select': ':*, *'}} for system columns like :updated_at".format(
+                    self.since_column, list(df.columns)))
+        self._meta["next_file"] += 1
+        stem = os.path.join(self.cache_dir, "page-{}".format(self._meta["next_file"]))
+        entry = {"offset": offset, "where": where, "rows": len(df),
+                 "etag": response_headers.get("ETag"),
+                 "last_modified": response_headers.get("Last-Modified"),
+                 "file": os.path.basename(frame_store.save(df, stem))}
+        if cached and cached["file"] != entry["file"]:
+            os.remove(os.path.join(self.cache_dir, cached["file"]))
+        return entry
+
+    async def _pages_from(self, offset, where):
+        """Fetches pages from offset until a page comes back short.
+
+        Pages are requested in waves of 1, 2, 4, ... up to concurrency pages,
+        so an update with few new rows doesn't request many empty pages.
+        """
+        pages = []
+        width = 1
+        while True:
+            wave = [offset + i*self.page_size for i in range(width)]
+            width = min(2 * width, self.concurrency)
+            entries = await asyncio.gather(*(self._page(start, where) for start in wave))
+            for i, entry in enumerate(entries):
+                pages.append(entry)
+                if entry["rows"] < self.page_size:
+                    # Later pages of the wave are past the end (empty); drop them.
+                    for extra in entries[i + 1:]:
+                        os.remove(os.path.join(self.cache_dir, extra["file"]))
+                    return pages
+            offset = wave[-1] + self.page_size
+
+    async def fetch_async(self):
+        """Updates the cache from the server and returns all rows."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._meta = {"pages": [], "since": None, "next_file": 0}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as file:
+                self._meta = json.load(file)
+        self._limiter = RateLimiter(self.rate)
+        self._pool = ConnectionPool(self.url, self.concurrency)
+        try:
+            pages = self._meta["pages"]
+            if self.since_column and pages and self._meta["since"] is not None:
+                where = "{} > {}".format(self.since_column, _literal(self._meta["since"]))
+                new = await self._pages_from(0, where)
+                for entry in new:
+                    if entry["rows"] == 0:  # Nothing newer; don't keep empty pages.
+                        os.remove(os.path.join(self.cache_dir, entry["file"]))
+                pages = pages + [entry for entry in new if entry["rows"]]
+            else:
+                # Revalidate cached pages; unchanged pages come back as 304.
+                pages = list(await asyncio.gather(*(
+                    self._page(page["offset"], page["where"], page) for page in pages)))
+                if not pages or pages[-1]["rows"] == self.page_size:
+                    pages += await self._pages_from(len(pages) * self.page_size, None)
+        finally:
+            self._pool.close()
+
+        frames = [frame_store.load(os.path.join(self.cache_dir, page["file"])) for page in pages]
+        df = pd.concat([frame for frame in frames if len(frame)] or frames, ignore_index=True)
+        if self.since_column:
+            if self.key and len(df):
+                df = df.drop_duplicates(self.key, keep="last", ignore_index=True)
+            since = df[self.since_column].max() if self.since_column in df else None
+            if pd.notna(since):  # NaN when no rows have been read yet.
+                self._meta["since"] = since.item() if isinstance(since, np.generic) else since
+
+        self._meta["pages"] = pages
+        with open(self._meta_path, "w") as file:
+            json.dump(self._meta, file)
+        return df
+
+    def fetch(self):
+        """Updates the cache from the server and returns all rows."""
+        return asyncio.run(self.fetch_async())
+
+
+def read_soda(url, **kwargs):
+    """Reads a SODA endpoint into a DataFrame through the cache.
+
+    Args:
+        url: CSV endpoint.
+        **kwargs: Passed to SodaClient, e.g. app_token or since_column.
+
+    Returns:
+        df: DataFrame of all rows.
+
+    """
+    return SodaClient(url, **kwargs).fetch()
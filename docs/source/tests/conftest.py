@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""Puts the docs/source folder on the path so tests can import its modules."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
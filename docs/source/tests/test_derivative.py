@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""Tests for derivative."""
+
+import numpy as np
+
+import derivative
+
+
+def test_points_near_a_domain_edge():
+    x = np.array([1e-3, 1e-4, 0.5, 2.0])
+    np.testing.assert_allclose(derivative.derivative(np.log, x), 1/x, rtol=1e-8)
+    slope, error = derivative.derivative(np.sqrt, 1e-4, full_output=True)
+    np.testing.assert_allclose(slope, 50.0, rtol=1e-8)
+    assert error < 1e-6
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Tests for downsample."""
+
+import numpy as np
+import pytest
+
+import downsample
+
+
+def _series(n):
+    x = np.arange(n, dtype=float)
+    y = np.sin(x/1000)
+    y[0] = np.nan  # Logs can start with a missing reading,
+    y[n//4:n//4 + 300] = np.nan  # and have gaps, shorter
+    y[n//2:n//2 + n//20] = np.nan  # or longer than a pixel.
+    return x, y
+
+
+@pytest.mark.parametrize("method", ["minmax", "lttb"])
+def test_nan_gaps(method):
+    x, y = _series(100000)
+    x_out, y_out = getattr(downsample, method)(x, y, 500)
+    assert len(x_out) <= 502
+    assert np.all(np.diff(x_out) >= 0)
+    gap = (x_out >= 50000) & (x_out < 55000)
+    assert gap.any() and np.isnan(y_out[gap]).all()  # The gap is drawn as a gap.
+    finite = ~np.isnan(y_out)
+    np.testing.assert_allclose(y_out[finite], np.sin(x_out[finite]/1000))
+    assert np.nanmax(y_out) > 0.99 and np.nanmin(y_out) < -0.99
+
+
+@pytest.mark.parametrize("method", ["minmax", "lttb"])
+def test_cache_view_with_gaps(method):
+    x, y = _series(2000000)
+    x_out, y_out = downsample.DecimationCache(x, y).view(0, x[-1], 2000, method)
+    gap = (x_out >= 1000000) & (x_out < 1100000)
+    assert gap.any() and np.isnan(y_out[gap]).all()
+    assert (~np.isnan(y_out)).sum() > 1000
+
+
+def test_all_nan():
+    x = np.arange(1000.0)
+    x_out, y_out = downsample.lttb(x, np.full(1000, np.nan), 50)
+    assert len(x_out) == 50 and np.isnan(y_out).all()
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""Tests for extrema."""
+
+import numpy as np
+
+import extrema
+
+
+def rosenbrock(x):
+    return (1 - x[0])**2 + 100 * (x[1] - x[0]**2)**2
+
+
+def test_one_minimum_from_many_seeds():
+    minima, _ = extrema.find_extrema(rosenbrock, [(-2, 2), (-1, 3)], n=50, kind="min")
+    assert len(minima) == 1
+    np.testing.assert_allclose(minima.x[0], [1, 1], atol=1e-4)
+
+
+def test_polynomial():
+    def f(x):
+        return -0.4*x**4 + 3 * x**3 + 0.9 * x**2 - 12 * x + 12
+
+    minima, maxima = extrema.find_extrema(f, (-3, 5))
+    np.testing.assert_allclose(minima.x, [-3, 1.17836], atol=1e-4)
+    np.testing.assert_allclose(maxima.x, [5, -1.13940], atol=1e-4)
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""Tests for frame_store."""
+
+import pandas as pd
+import pytest
+
+import frame_store
+
+
+def test_round_trip(tmp_path):
+    df = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+    for frame in (df, df.set_index("a")):
+        path = frame_store.save(frame, str(tmp_path / "frame"))
+        pd.testing.assert_frame_equal(frame_store.load(path), frame)
+
+
+def test_failed_save_leaves_no_file(tmp_path):
+    df = pd.DataFrame({"a": [1, 2], "f": [lambda: 0, lambda: 1]})  # Can't be saved.
+    with pytest.raises(Exception):
+        frame_store.save(df, str(tmp_path / "frame"))
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Tests for incremental_pivot."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import incremental_pivot
+
+
+@pytest.fixture
+def projects():
+    return pd.DataFrame({
+        "Engineer": ["Ann", "Bob", "Ann", "Cy", None, "Bob"],
+        "CategoryID": [1, 2, np.nan, 1, 2, 2],
+        "ActualDays": [10.0, 5.0, 7.0, np.nan, 3.0, 4.0],
+        "Finished": pd.to_datetime(["2020-01-05", "2020-02-01", "2020-02-03",
+                                    "2020-03-09", "2020-03-10", "2020-04-01"]),
+    })
+
+
+def test_matches_pandas(projects):
+    aggregate = incremental_pivot.PivotAggregate.from_frame(
+        projects, "Engineer", "CategoryID", values="ActualDays")
+    expected = projects.pivot_table(values="ActualDays", index="Engineer",
+                                    columns="CategoryID", aggfunc="sum", fill_value=0)
+    pd.testing.assert_frame_equal(aggregate.pivot("sum"), expected, check_dtype=False,
+                                  check_names=False, check_column_type=False)
+    for column in ("Engineer", "CategoryID"):
+        counts = aggregate.value_counts(column)
+        assert counts.to_dict() == projects[column].value_counts().to_dict()
+
+
+def test_save_and_load_with_dates(projects, tmp_path):
+    path = tmp_path / "pivot.json"
+    aggregate = incremental_pivot.PivotAggregate.from_frame(projects, "Engineer", "Finished")
+    aggregate.append(projects.iloc[:0], watermark=projects["Finished"].max())
+    aggregate.save(path)
+
+    loaded = incremental_pivot.PivotAggregate.load(path)
+    assert loaded.watermark == pd.Timestamp("2020-04-01")
+    pd.testing.assert_frame_equal(loaded.pivot(), aggregate.pivot())
+
+    aggregate.append(projects.iloc[:0], watermark=np.datetime64("2021-01-01"))  # numpy date
+    aggregate.save(path)
+    assert incremental_pivot.PivotAggregate.load(path).watermark == pd.Timestamp("2021-01-01")
+
+
+def test_failed_save_keeps_previous_file(projects, tmp_path):
+    path = tmp_path / "pivot.json"
+    aggregate = incremental_pivot.PivotAggregate.from_frame(projects, "Engineer", "CategoryID")
+    aggregate.save(path)
+    before = path.read_text()
+
+    aggregate.watermark = object()
+    with pytest.raises(TypeError):
+        aggregate.save(path)
+    assert path.read_text() == before
+    assert list(tmp_path.iterdir()) == [path]
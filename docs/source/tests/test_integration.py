@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""Tests for integration."""
+
+import numpy as np
+
+import integration
+
+
+def test_interval_ending_at_last_sample_uses_simpson():
+    x = np.linspace(0, 2, 21)
+    y = x**2
+    areas = integration.interval_integrals(y, x, [0, 0.5, 1], [2, 2, 2], method="simpson")
+    expected = integration.cumulative(y, x, method="simpson")
+    np.testing.assert_allclose(areas, expected[-1] - expected[[0, 5, 10]], rtol=1e-12)
+    np.testing.assert_allclose(areas[0], 8/3, rtol=1e-12)
+
+
+def test_interval_between_samples_interpolates():
+    x = np.arange(5.0)
+    areas = integration.interval_integrals(2 * x, x, [0.5], [3.25])
+    np.testing.assert_allclose(areas, [3.25**2 - 0.5**2])
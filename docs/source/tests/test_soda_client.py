@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Tests for soda_client, against a local stand-in SODA server."""
+
+import csv
+import http.server
+import io
+import os
+import re
+import threading
+import urllib.parse
+
+import pytest
+
+import soda_client
+
+
+class _Dataset:
+    """Rows served by the stand-in server. System columns start with ':'."""
+
+    def __init__(self):
+        self.rows = []
+
+    def add(self, count, stamp):
+        start = len(self.rows)
+        for i in range(start, start + count):
+            self.rows.append({":id": i, ":updated_at": stamp, "value": i * 10})
+
+    def update(self, ids, stamp):
+        for i in ids:
+            self.rows[i][":updated_at"] = stamp
+            self.rows[i]["value"] += 1
+
+
+def _server(dataset):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+            rows = sorted(dataset.rows, key=lambda row: row[query.get("$order", ":id")])
+            where = query.get("$where")
+            if where:
+                column, literal = re.fullmatch(r"(\S+) > (.+)", where).groups()
+                value = literal.strip("'") if literal.startswith("'") else float(literal)
+                rows = [row for row in rows if row[column] > value]
+            offset, limit = int(query.get("$offset", 0)), int(query.get("$limit", 1000))
+            rows = rows[offset:offset + limit]
+            columns = ["value"]
+            if query.get("$select", "").startswith(":*"):
+                columns = [":id", ":updated_at", "value"]
+            text = io.StringIO()
+            writer = csv.DictWriter(text, columns, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+            body = text.getvalue().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def served():
+    dataset = _Dataset()
+    server = _server(dataset)
+    url = "http://127.0.0.1:{}/resource/test.csv".format(server.server_address[1])
+    yield dataset, url
+    server.shutdown()
+
+
+def _client(url, cache_dir, **kwargs):
+    return soda_client.SodaClient(url, cache_dir=str(cache_dir), page_size=1000, rate=1000,
+                                  since_column=":updated_at", params={"$select": ":*, *"},
+                                  **kwargs)
+
+
+def _cached_files(client):
+    return [name for name in os.listdir(client.cache_dir) if name.startswith("page-")]
+
+
+def test_incremental_fetch_only_adds_new_rows(served, tmp_path):
+    dataset, url = served
+    dataset.add(2500, "2024-01-01")
+    client = _client(url, tmp_path, key=":id")
+    assert len(client.fetch()) == 2500
+
+    # Nothing changed: no new rows and no new cached pages.
+    files = len(_cached_files(client))
+    assert len(client.fetch()) == 2500
+    assert len(_cached_files(client)) == files
+
+    dataset.add(300, "2024-01-02")
+    dataset.update([5, 6], "2024-01-02")
+    df = client.fetch()
+    assert len(df) == 2800
+    assert df[":id"].is_unique
+    assert df.set_index(":id").loc[5, "value"] == 51
+
+
+def test_empty_first_fetch_then_rows(served, tmp_path):
+    dataset, url = served
+    client = _client(url, tmp_path)
+    assert len(client.fetch()) == 0
+    dataset.add(1500, "2024-01-01")
+    for _ in range(3):
+        df = client.fetch()
+        assert len(df) == 1500
+        assert df[":id"].is_unique
+
+
+def test_missing_since_column_raises(served, tmp_path):
+    dataset, url = served
+    dataset.add(10, "2024-01-01")
+    client = soda_client.SodaClient(url, cache_dir=str(tmp_path), rate=1000,
+                                    since_column=":updated_at")
+    with pytest.raises(ValueError, match="since_column"):
+        client.fetch()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Tests for civil.water: batch functions against the scalar ones."""
+
+import numpy as np
+import pytest
+
+from civil import water
+
+rtol = 1e-9  # Batch results match the scalar functions within this tolerance.
+diameters = np.array([6.0, 12.0, 36.0, 72.0])
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("CIVIL_CACHE_DIR", str(tmp_path))
+
+
+def _scalar_geometry(kind, size, theta_degrees, depth):
+    """Returns P, Rh and A from the scalar functions, one section at a time."""
+    expected = np.empty((3,) + np.shape(depth))
+    for i in np.ndindex(np.shape(depth)):
+        d = depth[i]
+        if kind == "pipe":
+            P, Rh = water.pipe(size[i], None if np.isnan(d) else d)
+        elif kind == "rectangle":
+            P, Rh = water.rectangle_channel(size[i], d)
+        elif kind == "trapezoid":
+            P, Rh = water.trapezoid_channel(size[i], theta_degrees, d)
+        else:
+            P, Rh = water.triangle_channel(theta_degrees, d)
+        expected[(slice(None),) + i] = P, Rh, (P * Rh if P else 0.0)  # Dry: no area.
+    return expected
+
+
+@pytest.mark.parametrize("kind, theta_degrees", [
+    ("pipe", 90.0), ("rectangle", 90.0), ("trapezoid", 60.0), ("triangle", 45.0)])
+def test_batch_matches_scalar(kind, theta_degrees):
+    ratios = np.linspace(0, 1, 41)
+    if kind == "pipe":
+        ratios = np.append(ratios, np.nan)  # NaN depth: flowing full.
+    size, depth = np.ix_(diameters, ratios)
+    depth = size * depth
+    sections = water.sections(kind, size, theta_degrees)
+
+    P, Rh, A, v, Q = water.batch_flow(sections, depth, 0.01, 0.013)
+    expected = _scalar_geometry(kind, np.broadcast_to(size, depth.shape), theta_degrees, depth)
+    for actual, wanted in zip((P, Rh, A), expected):
+        np.testing.assert_allclose(actual, wanted, rtol=rtol, atol=0, equal_nan=True)
+    scalar_v, scalar_Q = water.velocity_and_flow(expected[0], expected[1], 0.01, 0.013)
+    np.testing.assert_allclose(Q, scalar_Q, rtol=rtol, atol=0, equal_nan=True)
+    np.testing.assert_allclose(v[A > 0], scalar_v[A > 0], rtol=rtol, atol=0)
+
+
+def test_fast_pipes_within_table_error():
+    table, error = water.pipe_table()
+    ratios = np.append(np.linspace(0, 1, 1001), np.nan)
+    size, depth = np.ix_(diameters, ratios)
+    depth = size * depth
+    sections = water.sections("pipe", size)
+
+    exact = water.batch_geometry(sections, depth)
+    fast = water.batch_geometry(sections, depth, fast=True)
+    # P/D, Rh/D and A/D^2 are the table columns 1, 2 and 0.
+    for actual, wanted, column, power in zip(fast, exact, (1, 2, 0), (1, 1, 2)):
+        difference = np.abs(actual - wanted)/size**power
+        known = ~np.isnan(wanted)  # Exact Rh of a dry pipe is 0/0.
+        assert np.all(difference[known] <= 1.01 * error[column] + 1e-15)
+
+    P, Rh = water.pipe(size, depth[:, :-1], fast=True)  # pipe() takes None for full.
+    np.testing.assert_allclose(P, fast[0][:, :-1])
+    np.testing.assert_allclose(Rh, fast[1][:, :-1])
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_overfull_pipe_is_nan(fast):
+    sections = water.sections("pipe", 12.0)
+    depth = np.array([12.0, 12 * (1 + 1e-13), 18.0, 36.0])
+    with np.errstate(invalid="ignore"):
+        Q = water.batch_flow(sections, depth, 0.01, 0.013, fast=fast)[4]
+    assert Q[0] == pytest.approx(Q[1]) and np.isfinite(Q[0])
+    assert np.isnan(Q[2:]).all()
+    assert np.isnan(water.pipe(12, 18)).all()
+
+
+@pytest.mark.parametrize("kind, size, theta_degrees", [
+    ("pipe", diameters, 90.0), ("rectangle", diameters, 90.0),
+    ("trapezoid", diameters, 60.0), ("triangle", 0.0, 45.0)])
+def test_normal_depth_round_trip(kind, size, theta_degrees):
+    size = np.broadcast_to(size, diameters.shape)[:, np.newaxis]
+    if kind == "pipe":
+        depth = size * np.linspace(0.01, water.pipe_max_flow_ratio, 30)
+    else:
+        depth = np.geomspace(0.1, 500, 30) * np.ones_like(size)  # Up to 40 x the width.
+    sections = water.sections(kind, size, theta_degrees)
+    Q = water.batch_flow(sections, depth, 0.004, 0.015)[4]
+    found, iterations = water.normal_depth(Q, sections, 0.004, 0.015)
+    np.testing.assert_allclose(found, depth, rtol=1e-7)
+    assert iterations < 100
+    if kind == "pipe":
+        Q = water.pipe_velocity_and_flow(size, depth, 0.004, 0.015)[1]
+        np.testing.assert_allclose(water.normal_depth(Q, sections, 0.004, 0.015)[0], depth,
+                                   rtol=1e-7)
+
+
+def test_normal_depth_of_pipe_near_full():
+    sections = water.sections("pipe", diameters)
+    full = water.pipe_velocity_and_flow(diameters, None, 0.01, 0.013)[1]
+    largest = water.pipe_velocity_and_flow(diameters, water.pipe_max_flow_ratio * diameters,
+                                           0.01, 0.013)[1]
+    depth = water.normal_depth((full + largest)/2, sections, 0.01, 0.013)[0]
+    # Two depths carry a flow between Q_full and Q_max; the lower one is returned.
+    assert np.all(depth < water.pipe_max_flow_ratio * diameters)
+    assert np.all(depth > 0.8 * diameters)
+    np.testing.assert_allclose(water.pipe_velocity_and_flow(diameters, depth, 0.01, 0.013)[1],
+                               (full + largest)/2, rtol=1e-9)
+
+    surcharged = water.normal_depth(1.01 * largest, sections, 0.01, 0.013)[0]
+    assert np.isnan(surcharged).all()
+
+
+def test_normal_depth_of_zero_and_negative_flow():
+    sections = water.sections(["pipe", "rectangle", "trapezoid", "triangle"], 12.0, 60.0)
+    np.testing.assert_array_equal(water.normal_depth(0.0, sections, 0.01, 0.013)[0], 0)
+    assert np.isnan(water.normal_depth(-1.0, sections, 0.01, 0.013)[0]).all()
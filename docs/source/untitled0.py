@@ -9,9 +9,10 @@ Created on Thu Apr  9 19:41:45 2020
 import matplotlib.pyplot as plt
 import numpy as np
 from scipy import optimize
-from scipy import misc
 from scipy import integrate
 
+import derivative
+
 
 
 def f(x):
@@ -19,7 +20,7 @@ def f(x):
 
 
 
-result = misc.derivative(f, 0.7, dx=0.0000001)
+result = derivative.derivative(f, 0.7)
 print(result)
 
 